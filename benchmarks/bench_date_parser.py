@@ -0,0 +1,122 @@
+"""
+Micro-benchmark: services.date_parser vs. the original
+AssignmentParser.parse_date_string().
+
+Run from the project root:
+
+    python benchmarks/bench_date_parser.py [repeat_count]
+"""
+import os
+import re
+import sys
+import timeit
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.date_parser import parse_date, parse_date_parts  # noqa: E402
+
+# Due/posted strings as they appear in Classroom notification emails
+CORPUS = [
+    "Oct 20",
+    "Oct 20, 11:59 PM",
+    "Nov 3",
+    "Sep 9",
+    "Dec 30",
+    "Jan 5",
+    "June 13",
+    "September 22",
+    "8:43 AM, Jun 13 (EDT)",
+    "12:05 PM, Oct 2 (EDT)",
+    "3:17 PM, Nov 14 (EST)",
+    "11:59 PM, Dec 31 (EST)",
+    "7:00 AM, Jan 8 (EST)",
+    "06/13/2025",
+    "2025-06-13",
+    "Tomorrow",
+    "Not found",
+]
+
+
+def legacy_parse_date_string(date_str):
+    """The implementation this module replaced, kept here as the baseline."""
+    if not date_str or date_str == "Not found":
+        return None
+
+    cleaned_date = re.sub(r"\s*\([^)]+\)", "", date_str)
+
+    date_formats = [
+        "%I:%M %p, %b %d",
+        "%b %d",
+        "%B %d",
+        "%m/%d/%Y",
+        "%Y-%m-%d",
+    ]
+
+    for fmt in date_formats:
+        try:
+            parsed_date = datetime.strptime(cleaned_date, fmt)
+            if parsed_date.year == 1900:
+                parsed_date = parsed_date.replace(year=2025)
+            return parsed_date
+        except ValueError:
+            continue
+
+    month_day_match = re.search(r"(\w+)\s+(\d+)", cleaned_date)
+    if month_day_match:
+        try:
+            month_name = month_day_match.group(1)
+            day = int(month_day_match.group(2))
+            month_map = {
+                "Jan": 1, "Feb": 2, "Mar": 3, "Apr": 4, "May": 5, "Jun": 6,
+                "Jul": 7, "Aug": 8, "Sep": 9, "Oct": 10, "Nov": 11, "Dec": 12,
+                "January": 1, "February": 2, "March": 3, "April": 4, "June": 6,
+                "July": 7, "August": 8, "September": 9, "October": 10,
+                "November": 11, "December": 12,
+            }
+            if month_name in month_map:
+                return datetime(2025, month_map[month_name], day)
+        except (ValueError, KeyError):
+            pass
+
+    return None
+
+
+def main():
+    repeat_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    corpus = CORPUS * repeat_count
+    reference = datetime(2025, 9, 1)
+
+    # Same month/day/time as before; only the year is now inferred
+    for date_str in CORPUS:
+        old, new = legacy_parse_date_string(date_str), parse_date(date_str, reference)
+        assert (old is None) == (new is None), date_str
+        if old is not None:
+            assert old.replace(year=2000) == new.replace(year=2000), date_str
+
+    devnull = open(os.devnull, "w")
+    stdout, sys.stdout = sys.stdout, devnull  # silence "Unable to parse date"
+    try:
+        legacy = min(
+            timeit.repeat(
+                lambda: [legacy_parse_date_string(s) for s in corpus], number=1, repeat=5
+            )
+        )
+        parse_date_parts.cache_clear()
+        current = min(
+            timeit.repeat(
+                lambda: [parse_date(s, reference) for s in corpus], number=1, repeat=5
+            )
+        )
+    finally:
+        sys.stdout = stdout
+        devnull.close()
+
+    print(f"{len(corpus)} date strings, best of 5")
+    print(f"  legacy parse_date_string: {legacy * 1000:8.1f} ms")
+    print(f"  date_parser.parse_date:   {current * 1000:8.1f} ms")
+    print(f"  speedup:                  {legacy / current:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Micro-benchmark: services.email_extractor vs. the original
+ClassroomDataManager.extract_assignment_info().
+
+Run from the project root:
+
+    python benchmarks/bench_email_extractor.py [message_count]
+"""
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.email_extractor import extract_assignments  # noqa: E402
+
+
+def legacy_extract_assignment_info(messages):
+    """The implementation this module replaced, kept here as the baseline."""
+    extracted_data = []
+    for data in messages:
+        html_content = data["payload"]["parts"][1]["body"]
+
+        assignment_name_match = re.search(r"<div>(.*?)</div>", html_content)
+        assignment_name = (
+            assignment_name_match.group(1) if assignment_name_match else "Not found"
+        )
+
+        link_pattern = r"https://accounts\.google\.com/AccountChooser\?continue="
+        link_match = re.search(
+            r"href=(https://accounts\.google\.com/AccountChooser\?continue=https://classroom\.google\.com/c/[^&]+)",
+            html_content,
+        )
+        class_link = link_match.group(1) if link_match else "Not found"
+        class_link = re.sub(link_pattern, "", class_link)
+
+        assignment_match = re.search(
+            r"href=(https://accounts\.google\.com/AccountChooser\?continue=https://classroom\.google\.com/c/[^&]+/a/[^&]+)",
+            html_content,
+        )
+        assignment_link = assignment_match.group(1) if assignment_match else "Not found"
+        assignment_link = re.sub(link_pattern, "", assignment_link)
+
+        description_match = re.search(r"<ul>(.*?)</ul>", html_content, re.DOTALL)
+        if description_match:
+            description_items = re.findall(r"<li>(.*?)</li>", description_match.group(1))
+            assignment_description = "\n".join(description_items)
+        else:
+            assignment_description = "Not found"
+
+        class_match = re.search(r">([^<]+)</td></tr></table></a></td>", html_content)
+        class_name = class_match.group(1) if class_match else "Not found"
+
+        due_date_match = re.search(r"Due ([^<]+)", html_content)
+        due_date = due_date_match.group(1) if due_date_match else "Not found"
+
+        posted_info_match = re.search(r"Posted on ([^<]+) by ([^<]+)", html_content)
+        if posted_info_match:
+            posted_date = posted_info_match.group(1)
+            posted_by = posted_info_match.group(2)
+        else:
+            posted_date = "Not found"
+            posted_by = "Not found"
+
+        extracted_data.append(
+            {
+                "assignment_name": assignment_name,
+                "assignment_link": assignment_link,
+                "class_link": class_link,
+                "assignment_description": assignment_description,
+                "class_name": class_name,
+                "due_date": due_date,
+                "posted_date": posted_date,
+                "posted_by": posted_by,
+            }
+        )
+    return extracted_data
+
+
+def make_message(i):
+    chooser = "https://accounts.google.com/AccountChooser?continue="
+    course = f"https://classroom.google.com/c/NjQ{i:05d}"
+    html = (
+        "<html><body><table>"
+        f'<tr><td><a href={chooser}{course}&amp;hl=en><table><tr><td>Period {i % 8} Biology</td></tr></table></a></td></tr>'
+        + "<tr><td>" + "<span style=\"color:#3c4043\">padding</span>" * 40 + "</td></tr>"
+        + f"<tr><td><div>Lab report {i}</div></td></tr>"
+        + "<tr><td><ul><li>Read chapter 4</li><li>Answer the questions</li></ul></td></tr>"
+        + f"<tr><td>Due Oct {i % 28 + 1}</td></tr>"
+        + f"<tr><td>Posted on 8:43 AM, Oct {i % 28 + 1} (EDT) by Ms. Teacher</td></tr>"
+        + f'<tr><td><a href={chooser}{course}/a/NzE{i:05d}/details&amp;hl=en>Open</a></td></tr>'
+        + "</table></body></html>"
+    )
+    return {
+        "id": f"msg{i}",
+        "payload": {
+            "mimeType": "multipart/alternative",
+            "parts": [
+                {"mimeType": "text/plain", "body": "Lab report", "parts": []},
+                {"mimeType": "text/html", "body": html, "parts": []},
+            ],
+        },
+    }
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    messages = [make_message(i) for i in range(count)]
+    extracted = [
+        {
+            key: value
+            for key, value in fields.items()
+            if key not in ("received_date", "message_id")
+        }
+        for fields in extract_assignments(messages)
+    ]
+    assert extracted == legacy_extract_assignment_info(messages)
+
+    repeat = 5
+    legacy = min(
+        timeit.repeat(lambda: legacy_extract_assignment_info(messages), number=1, repeat=repeat)
+    )
+    current = min(timeit.repeat(lambda: extract_assignments(messages), number=1, repeat=repeat))
+    print(f"{count} messages, best of {repeat}")
+    print(f"  legacy extract_assignment_info: {legacy * 1000:8.1f} ms")
+    print(f"  email_extractor:                {current * 1000:8.1f} ms")
+    print(f"  speedup:                        {legacy / current:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Post a fake Gmail Pub/Sub push notification to a running server.
+
+Stands in for Pub/Sub when testing push mode locally:
+
+    python fake_gmail_push.py                  # one past the last synced historyId
+    python fake_gmail_push.py --history-id 42  # an old historyId, which is ignored
+
+The address defaults to the authenticated Gmail account (token.json).
+"""
+import argparse
+import base64
+import json
+import os
+import time
+
+import requests
+from dotenv import load_dotenv
+
+from services.sync_state import SyncState
+
+
+def build_envelope(email_address, history_id):
+    data = json.dumps({"emailAddress": email_address, "historyId": history_id})
+    return {
+        "message": {
+            "data": base64.b64encode(data.encode("utf-8")).decode("ascii"),
+            "messageId": str(int(time.time() * 1000)),
+            "publishTime": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "subscription": "projects/local/subscriptions/fake-gmail-push",
+    }
+
+
+def gmail_address():
+    from services.gmail_service import get_gmail_service
+    from services.google_auth import get_credential_provider
+
+    service = get_gmail_service(get_credential_provider().get_credentials())
+    return service.users().getProfile(userId="me").execute()["emailAddress"]
+
+
+def next_history_id(state_file):
+    """One past the historyId of the last sync, so the push triggers exactly one sync."""
+    history_id = SyncState(state_file).get("history_id")
+    return int(history_id) + 1 if history_id else None
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default=os.getenv("API_URL", "http://localhost:8888"))
+    parser.add_argument("--token", default=os.getenv("GMAIL_PUSH_TOKEN") or os.getenv("API_SECRET"))
+    parser.add_argument("--email", help="mailbox address (default: the Gmail profile)")
+    parser.add_argument("--history-id", type=int, help="default: last synced historyId + 1")
+    parser.add_argument("--state-file", default="cache/gmail_state.json")
+    parser.add_argument("--count", type=int, default=1, help="pushes to send")
+    args = parser.parse_args()
+
+    if args.history_id is None:
+        args.history_id = next_history_id(args.state_file)
+        if args.history_id is None:
+            parser.error(f"no historyId in {args.state_file} yet, run a sync or pass --history-id")
+    if args.email is None:
+        args.email = gmail_address()
+
+    url = f"{args.url.rstrip('/')}/gmail/push"
+    for i in range(args.count):
+        envelope = build_envelope(args.email, args.history_id + i)
+        response = requests.post(url, params={"token": args.token}, json=envelope)
+        print(f"historyId {args.history_id + i}: {response.status_code} {response.text}")
+
+
+if __name__ == "__main__":
+    main()
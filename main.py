@@ -1,13 +1,22 @@
 import os
 import json
+import asyncio
 import logging
 import pathlib
 import sys
+from contextlib import asynccontextmanager
+import aiohttp
 from dotenv import load_dotenv
 from services.classroom import ClassroomDataManager
-from services.notion import NotionDatabaseManager
+from services.async_classroom import AsyncClassroomClient
+from services.notion import NotionDatabaseManager, get_shared_session
+from services.async_notion import AsyncNotionClient
 from services.assignment_parser import AssignmentParser
 from services.cache_manager import NotionCache
+from services.snapshot_store import SnapshotStore
+from services.parse_cache import ParseCache
+from services.metrics import time_stage, timed
+from services.run_report import RunReport, report_count, report_error, report_item
 
 # Set up logging: default to stdout (serverless-friendly). Optional file logging via env.
 log_to_file = os.getenv("LOG_TO_FILE", "false").lower() in ("1", "true", "yes")
@@ -34,160 +43,337 @@ logging.basicConfig(
 )
 
 
-def load_json_file(file_path):
+# Use lowercase keys for filter criteria
+FILTER_CRITERIA = {
+    "from": "no-reply@classroom.google.com",
+    "subject": "New assignment",
+}
+# Snapshot name of the email cache (outputs/classroom_data.json by default)
+EMAIL_CACHE = "classroom_data"
+
+
+def resolve_after_date(after_date):
+    # If no date provided as parameter, check command line argument
+    if after_date is None and len(sys.argv) > 1:
+        after_date = sys.argv[1]
+        print(f"Using date filter: after:{after_date}")
+    elif after_date is not None:
+        print(f"Using date filter: after:{after_date}")
+    else:
+        print("No date specified, using yesterday's date as default")
+        print("To specify a date, run: python main.py YYYY/MM/DD")
+        print("Example: python main.py 2025/8/1")
+    return after_date
+
+
+def select_messages(cdm, email_cache, latest_messages):
+    """Combine the messages fetched by this run with the local email cache."""
+    if len(email_cache) == 0:
+        return latest_messages
+
+    cached_ids = {msg["id"] for msg in email_cache}
+    if cdm.last_sync_incremental:
+        # Incremental runs only return mail added since the last sync,
+        # so merge it into the cache instead of replacing the cache
+        new_messages = [
+            msg for msg in latest_messages or [] if msg["id"] not in cached_ids
+        ]
+        if new_messages:
+            logging.info(f"Retrieved {len(new_messages)} new messages")
+        else:
+            logging.info("No new messages. Using email_cache for data")
+        return email_cache + new_messages
+
+    if latest_messages:
+        # Check if any of the new messages are not in our cache
+        new_message_exists = any(
+            msg["id"] not in cached_ids for msg in latest_messages
+        )
+        if not new_message_exists:
+            logging.info("No new messages. Using email_cache for data")
+            return email_cache
+        logging.info(f"Retrieved {len(latest_messages)} messages")
+        return latest_messages
+
+    return email_cache  # Fallback to cache if API call fails
+
+
+def save_email_cache(store, email_cache, messages):
+    """Persist this run's messages, skipping the write when nothing changed."""
+    cached_ids = {msg["id"] for msg in email_cache}
+    if store.format == "jsonl":
+        # Append-only: the cache keeps every message ever seen
+        store.append(
+            EMAIL_CACHE, [msg for msg in messages if msg["id"] not in cached_ids]
+        )
+    elif {msg["id"] for msg in messages} != cached_ids:
+        store.save(EMAIL_CACHE, messages)
+
+
+def prepare_assignments(cdm, ap, notion_cache, store, messages):
+    """
+    Run the CPU-bound stages: filter, extract, parse and drop cached assignments.
+
+    :return: A (pages_to_create, result) tuple. result is set when the run ends
+             here and should be returned as is.
+    """
+    with time_stage("filter"):
+        filtered_messages = cdm.filter_messages(messages)
+    report_count("filtered", len(filtered_messages))
+    store.save_debug("filtered_classroom_data", filtered_messages)
+
+    # Extract and parse assignments (messages are already filtered). Results
+    # are cached per message, so only messages not seen before are processed
+    print("filtering messages")
+    extracted_data, parsed_data = ParseCache(store).process(
+        filtered_messages,
+        timed("extract", cdm.extract_assignment_info),
+        timed("parse", ap.parse_assignments),
+    )
+    report_count("extracted", len(extracted_data))
+    report_count("parsed", len(parsed_data))
+    if not extracted_data:
+        logging.warning("No assignments extracted from messages")
+        return None, {"message": "No assignments extracted from messages"}
+
+    store.save_debug("extracted_classroom_data", extracted_data)
+
+    # Filter out assignments already in Notion
+    with time_stage("cache_filter"):
+        uncached_data = notion_cache.filter_with_cache(parsed_data)
+    report_count("new_assignments", len(uncached_data or []))
+
+    if not uncached_data:
+        logging.info("No new assignments to process")
+        print("No new assignments to process")
+        print("-------------------------------------------------")
+        return None, {"message": "No new assignments to process"}
+
+    print(f"Adding {len(uncached_data)} new assignments to Notion database...")
+    for i, assignment in enumerate(uncached_data, 1):
+        assignment_name = assignment["properties"]["Name"]["title"][0]["text"][
+            "content"
+        ]
+        print(f"  {i}. Adding: {assignment_name}")
+    return uncached_data, None
+
+
+def warm_up_cache(notion_cache, ndm):
+    """
+    Rebuild an empty Notion cache from the pages already in the database.
+
+    Without this a lost cache (e.g. a cold start of a serverless deploy) would
+    re-post every assignment. Disable with NOTION_CACHE_WARMUP=false.
+    """
+    if os.getenv("NOTION_CACHE_WARMUP", "true").lower() not in ("1", "true", "yes"):
+        return
+    if not notion_cache.is_empty():
+        return
+    logging.info("Notion cache is empty, rebuilding it from the Notion database")
     try:
-        with open(file_path, "r") as file:
-            content = file.read().strip()
-            if content:
-                return json.loads(content)
-            else:
-                logging.warning(f"File {file_path} is empty. Returning an empty list.")
-                return []
-    except FileNotFoundError:
-        logging.info(f"File {file_path} not found. Returning an empty list.")
-        return []
-    except json.JSONDecodeError:
-        logging.error(f"Error decoding JSON from {file_path}. Returning an empty list.")
-        return []
+        count = notion_cache.reconcile(ndm.fetch_existing_assignments())
+        logging.info(f"Cached {count} assignments already in the Notion database")
+    except Exception as e:
+        logging.warning(f"Could not rebuild the Notion cache from Notion: {str(e)}")
+
+
+def report_responses(store, uncached_data, responses):
+    # Check responses and print results
+    successful_additions = 0
+    failed_additions = 0
+    for i, response in enumerate(responses):
+        assignment_name = uncached_data[i]["properties"]["Name"]["title"][0]["text"][
+            "content"
+        ]
+        url = uncached_data[i]["properties"]["URL"]["url"]
+        if isinstance(response, dict) and response.get("object") == "page":
+            successful_additions += 1
+            print(f"  ✓ Successfully added: {assignment_name}")
+            report_item(
+                name=assignment_name, url=url, outcome="created", page_id=response.get("id")
+            )
+        else:
+            failed_additions += 1
+            print(f"  ✗ Failed to add: {assignment_name}")
+            error = response.get("message") if isinstance(response, dict) else None
+            if error:
+                print(f"    Error: {error}")
+            report_item(name=assignment_name, url=url, outcome="failed", error=error)
+            report_error(error or "Notion did not create the page", "notion_post", url=url)
+
+    print(f"\nSummary: {successful_additions} successful, {failed_additions} failed")
+    report_count("created", successful_additions)
+    report_count("failed", failed_additions)
+    logging.info(
+        f"Processed {len(responses)} new assignments: {successful_additions} successful, {failed_additions} failed"
+    )
+    logging.info("Saving assignment responses to file")
+    store.save_debug("new_assignments", responses)
+    print("-------------------------------------------------")
+    return {
+        "message": f"Processed {len(responses)} new assignments: {successful_additions} successful, {failed_additions} failed",
+        "created": successful_additions,
+        "failed": failed_additions,
+    }
 
 
 def main(after_date=None):
+    notion_cache = None
     try:
-        # If no date provided as parameter, check command line argument
-        if after_date is None and len(sys.argv) > 1:
-            after_date = sys.argv[1]
-            print(f"Using date filter: after:{after_date}")
-        elif after_date is not None:
-            print(f"Using date filter: after:{after_date}")
-        else:
-            print("No date specified, using yesterday's date as default")
-            print("To specify a date, run: python main.py YYYY/MM/DD")
-            print("Example: python main.py 2025/8/1")
+        after_date = resolve_after_date(after_date)
 
         load_dotenv()
         cdm = ClassroomDataManager()
         ndm = NotionDatabaseManager(
             database_id=os.environ.get("NOTION_DATABASE_ID"),
             token=os.environ.get("NOTION_TOKEN"),
+            session=get_shared_session(),
         )
         notion_cache = NotionCache()
+        warm_up_cache(notion_cache, ndm)
 
         # Initialize AssignmentParser
         ap = AssignmentParser()
 
-        # Use lowercase keys for filter criteria
-        filter_criteria = {
-            "from": "no-reply@classroom.google.com",
-            "subject": "New assignment",
-        }
-
-        email_cache = load_json_file("outputs/classroom_data.json")
+        store = SnapshotStore()
+        email_cache = store.load(EMAIL_CACHE)
 
         # Improved caching logic
         if len(email_cache) == 0:
             logging.info("Cache is empty, running service")
-            messages = cdm.run(after_date=after_date, filter_criteria=filter_criteria)
-        else:
-            # Check latest messages to see if there are any new ones
-            latest_messages = cdm.run(
-                after_date=after_date, filter_criteria=filter_criteria
-            )
-            if latest_messages:
-                # Check if any of the new messages are not in our cache
-                cached_ids = {msg["id"] for msg in email_cache}
-                new_message_exists = any(
-                    msg["id"] not in cached_ids for msg in latest_messages
-                )
-
-                if not new_message_exists:
-                    logging.info("No new messages. Using email_cache for data")
-                    messages = email_cache
-                else:
-                    messages = latest_messages
-                    logging.info(f"Retrieved {len(messages)} messages")
-            else:
-                messages = email_cache  # Fallback to cache if API call fails
-
-        # Save the messages to cache
-        if messages:
-            cdm.save_to_json(messages, "outputs/classroom_data.json")
-
-            filtered_messages = cdm.filter_messages(messages)
-            cdm.save_to_json(filtered_messages, "outputs/filtered_classroom_data.json")
-
-            # Extract assignment info (messages are already filtered)
-            print("filtering messages")
-            extracted_data = cdm.extract_assignment_info(filtered_messages)
-            if extracted_data:
-                cdm.save_to_json(
-                    extracted_data, "outputs/extracted_classroom_data.json"
-                )
-
-                # Parse and filter
-                parsed_data = ap.parse_assignments(extracted_data)
-                uncached_data = notion_cache.filter_with_cache(parsed_data)
-
-                # Add new assignments to Notion
-                if not uncached_data:
-                    logging.info("No new assignments to process")
-                    print("No new assignments to process")
-                    print("-------------------------------------------------")
-                    return {"message": "No new assignments to process"}
-                else:
-                    print(
-                        f"Adding {len(uncached_data)} new assignments to Notion database..."
-                    )
-                    for i, assignment in enumerate(uncached_data, 1):
-                        assignment_name = assignment["properties"]["Name"]["title"][0][
-                            "text"
-                        ]["content"]
-                        print(f"  {i}. Adding: {assignment_name}")
-
-                    responses = ndm.post_data(uncached_data)
-
-                    # Check responses and print results
-                    successful_additions = 0
-                    failed_additions = 0
-                    for i, response in enumerate(responses):
-                        assignment_name = uncached_data[i]["properties"]["Name"][
-                            "title"
-                        ][0]["text"]["content"]
-                        if (
-                            isinstance(response, dict)
-                            and response.get("object") == "page"
-                        ):
-                            successful_additions += 1
-                            print(f"  ✓ Successfully added: {assignment_name}")
-                        else:
-                            failed_additions += 1
-                            print(f"  ✗ Failed to add: {assignment_name}")
-                            if isinstance(response, dict) and "message" in response:
-                                print(f"    Error: {response['message']}")
-
-                    print(
-                        f"\nSummary: {successful_additions} successful, {failed_additions} failed"
-                    )
-                    logging.info(
-                        f"Processed {len(responses)} new assignments: {successful_additions} successful, {failed_additions} failed"
-                    )
-                    logging.info("Saving assignment responses to file")
-                    cdm.save_to_json(responses, "outputs/new_assignments.json")
-                    print("-------------------------------------------------")
-                    return {
-                        "message": f"Processed {len(responses)} new assignments: {successful_additions} successful, {failed_additions} failed"
-                    }
-            else:
-                logging.warning("No assignments extracted from messages")
-                return {"message": "No assignments extracted from messages"}
-        else:
+        # Check latest messages to see if there are any new ones. With an empty
+        # cache there is nothing to merge into, so always do a full search.
+        latest_messages = cdm.run(
+            after_date=after_date,
+            filter_criteria=FILTER_CRITERIA,
+            incremental=len(email_cache) > 0,
+            known_messages=email_cache,
+        )
+        messages = select_messages(cdm, email_cache, latest_messages)
+        if not messages:
             logging.warning("No messages retrieved")
             return {"message": "No messages retrieved"}
 
+        # Save the messages to cache
+        save_email_cache(store, email_cache, messages)
+
+        uncached_data, result = prepare_assignments(
+            cdm, ap, notion_cache, store, messages
+        )
+        if result is not None:
+            return result
+
+        # Add new assignments to Notion
+        with time_stage("notion_post"):
+            responses = ndm.post_data(uncached_data)
+        notion_cache.commit(uncached_data, responses)
+        return report_responses(store, uncached_data, responses)
+
     except Exception as e:
         logging.error(f"An error occurred: {str(e)}", exc_info=True)
+        report_error(str(e))
         print(e)
-        return {"message": f"Error: {str(e)}"}
+        return {"message": f"Error: {str(e)}", "error": str(e)}
+    finally:
+        # One SQLite connection per run; the server would leak one per sync
+        if notion_cache is not None:
+            notion_cache.close()
+
+
+@asynccontextmanager
+async def client_session(session=None):
+    """Use the caller's aiohttp session, or a temporary one closed afterwards."""
+    if session is not None:
+        yield session
+        return
+    async with aiohttp.ClientSession() as session:
+        yield session
+
+
+async def main_async(after_date=None, session=None):
+    """
+    asyncio-native variant of main() for the FastAPI server.
+
+    Gmail and Notion I/O runs on aiohttp, so a slow Notion call does not hold a
+    thread and overlapping syncs share one event loop. The CPU-bound parsing
+    stages and file writes run in worker threads.
+
+    :param session: aiohttp session to reuse across runs (the server passes its
+                    own so keep-alive connections survive between syncs); a
+                    temporary one is used when omitted
+    """
+    notion_cache = None
+    try:
+        after_date = resolve_after_date(after_date)
+
+        load_dotenv()
+        cdm = ClassroomDataManager()
+        notion_cache = NotionCache()
+        ndm = NotionDatabaseManager(
+            database_id=os.environ.get("NOTION_DATABASE_ID"),
+            token=os.environ.get("NOTION_TOKEN"),
+            session=get_shared_session(),
+        )
+        await asyncio.to_thread(warm_up_cache, notion_cache, ndm)
+        ap = AssignmentParser()
+
+        store = SnapshotStore()
+        email_cache = await asyncio.to_thread(store.load, EMAIL_CACHE)
+        if len(email_cache) == 0:
+            logging.info("Cache is empty, running service")
+
+        async with client_session(session) as session:
+            gmail = AsyncClassroomClient(cdm, session)
+            latest_messages = await gmail.run(
+                after_date=after_date,
+                filter_criteria=FILTER_CRITERIA,
+                incremental=len(email_cache) > 0,
+                known_messages=email_cache,
+            )
+            messages = select_messages(cdm, email_cache, latest_messages)
+            if not messages:
+                logging.warning("No messages retrieved")
+                return {"message": "No messages retrieved"}
+
+            await asyncio.to_thread(save_email_cache, store, email_cache, messages)
+            uncached_data, result = await asyncio.to_thread(
+                prepare_assignments, cdm, ap, notion_cache, store, messages
+            )
+            if result is not None:
+                return result
+
+            notion = AsyncNotionClient(
+                session,
+                database_id=os.environ.get("NOTION_DATABASE_ID"),
+                token=os.environ.get("NOTION_TOKEN"),
+            )
+            with time_stage("notion_post"):
+                responses = await notion.post_data(uncached_data)
+            await asyncio.to_thread(notion_cache.commit, uncached_data, responses)
+
+        return await asyncio.to_thread(
+            report_responses, store, uncached_data, responses
+        )
+
+    except Exception as e:
+        logging.error(f"An error occurred: {str(e)}", exc_info=True)
+        report_error(str(e))
+        print(e)
+        return {"message": f"Error: {str(e)}", "error": str(e)}
+    finally:
+        if notion_cache is not None:
+            notion_cache.close()
+
+
+def run_with_report(after_date=None, trigger="cli"):
+    """Run main() and return its result together with the run's structured report."""
+    report = RunReport(trigger=trigger, after_date=after_date)
+    with report.activate():
+        result = main(after_date)
+    report.finish(result)
+    logging.info(f"Run report: {json.dumps(report.summary())}")
+    return result, report
 
 
 if __name__ == "__main__":
-    main()
+    run_with_report()
@@ -1,8 +1,18 @@
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, BackgroundTasks, Query, HTTPException, Depends, Header
+from fastapi import FastAPI, BackgroundTasks, Query, HTTPException, Depends, Header, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.responses import HTMLResponse
-from main import main
+from fastapi.responses import HTMLResponse, PlainTextResponse
+from main import main_async
+from services.notion import close_shared_session
+from services.sync_coordinator import SyncCoordinator
+from services.gmail_service import service_stats
+from services.google_auth import close_credential_provider, get_credential_provider
+from services.gmail_watch import GmailWatch, decode_push
+from services.adaptive_scheduler import AdaptiveSchedule, AdaptiveScheduler, classify_result
+from services.job_runner import JobRunner
+from services.metrics import SYNC_RUNS, render_metrics, time_stage
+from services.run_report import RunHistory, RunReport
+from services.utils import env_number
 import uvicorn
 import asyncio
 import aiohttp
@@ -16,6 +26,23 @@ load_dotenv()
 # Security setup
 security = HTTPBearer()
 API_SECRET = os.getenv("API_SECRET")
+# Pub/Sub can't send our bearer token, so push requests carry ?token=... instead
+GMAIL_PUSH_TOKEN = os.getenv("GMAIL_PUSH_TOKEN") or API_SECRET
+
+
+# Safety-net polling interval used while push notifications are on
+PUSH_FALLBACK_SECONDS = env_number("GMAIL_PUSH_FALLBACK_SECONDS", 1800)
+# How often the Gmail watch is checked and renewed if it is close to expiring
+WATCH_CHECK_SECONDS = 60 * 60
+# How long shutdown waits for a running sync before cancelling it
+SHUTDOWN_GRACE_SECONDS = env_number("SHUTDOWN_GRACE_SECONDS", 30)
+
+gmail_watch = GmailWatch()
+scheduler: Optional[AdaptiveScheduler] = None
+jobs = JobRunner()
+run_history = RunHistory()
+# One aiohttp session for every sync, so Gmail and Notion connections are reused
+http_session: Optional[aiohttp.ClientSession] = None
 
 def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Verify the API token"""
@@ -30,26 +57,63 @@ def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    global scheduler, http_session
+    http_session = aiohttp.ClientSession()
     enable_scheduler = os.getenv("ENABLE_SCHEDULER", "false").lower() in ("1", "true", "yes")
-    if enable_scheduler:
-        asyncio.create_task(schedule_sync())
+    if gmail_watch.enabled:
+        jobs.start("gmail-watch", maintain_watch)
+        # Push notifications trigger the syncs; polling only catches missed pushes
+        scheduler = AdaptiveScheduler(
+            AdaptiveSchedule(
+                min_interval=PUSH_FALLBACK_SECONDS, base_interval=PUSH_FALLBACK_SECONDS
+            ),
+            is_running=lambda: coordinator.running,
+        )
+    elif enable_scheduler:
+        scheduler = AdaptiveScheduler(is_running=lambda: coordinator.running)
+    if scheduler is not None:
+        jobs.start("scheduled-sync", schedule_sync)
     yield
+    await jobs.stop()
+    if not await coordinator.wait_idle(SHUTDOWN_GRACE_SECONDS):
+        print("Cancelled the running sync on shutdown")
+    close_shared_session()
+    await http_session.close()
+    close_credential_provider()
 
 
 app = FastAPI(lifespan=lifespan)
 
 
-async def run_sync(after_date: Optional[str] = None):
+async def _run_pipeline(after_date: Optional[str] = None):
     print("Running Classroom to Notion sync...")
     if after_date:
         print(f"Using date filter: after:{after_date}")
-    try:
-        result = await asyncio.to_thread(main, after_date)
-        print(result)
-        return result
-    except Exception as e:
-        print(f"Error during sync: {str(e)}")
-        return {"error": str(e)}
+    trigger = coordinator.current["trigger"] if coordinator.current else None
+    report = RunReport(trigger=trigger, after_date=after_date)
+    with report.activate():
+        try:
+            with time_stage("sync"):
+                result = await main_async(after_date, session=http_session)
+            print(result)
+        except Exception as e:
+            print(f"Error during sync: {str(e)}")
+            result = {"error": str(e)}
+    report.finish(result)
+    run_history.add(report)
+    SYNC_RUNS.inc(outcome=classify_result(result))
+    return {**result, "run_id": report.run_id, "report": report.to_dict()}
+
+
+# Every trigger goes through the coordinator so only one sync touches the
+# output and cache files at a time
+coordinator = SyncCoordinator(_run_pipeline)
+
+
+async def run_sync(after_date: Optional[str] = None, trigger: str = "api"):
+    if coordinator.running:
+        print("A sync is already running, coalescing this request with it")
+    return await coordinator.run(after_date, trigger=trigger)
 
 
 @app.post("/trigger-sync")
@@ -58,8 +122,11 @@ async def trigger_sync(
     after_date: Optional[str] = Query(None),
     token: str = Depends(verify_token)
 ):
-    background_tasks.add_task(run_sync, after_date)
+    already_running = coordinator.running
+    background_tasks.add_task(run_sync, after_date, "trigger-sync")
     message = "Sync task has been triggered and is running in the background. Check your Notion workspace for updates."
+    if already_running:
+        message += " A sync was already in progress, so this request was coalesced with it."
     if after_date:
         message += f" Using date filter: after:{after_date}"
     return {"message": message}
@@ -70,10 +137,47 @@ async def run_sync_endpoint(
     after_date: Optional[str] = Query(None),
     token: str = Depends(verify_token)
 ):
-    result = await run_sync(after_date)
+    result = await run_sync(after_date, "run-sync")
     return result
 
 
+@app.get("/sync-status")
+async def sync_status(token: str = Depends(verify_token)):
+    status = coordinator.status()
+    status["gmail_service"] = service_stats()
+    status["credentials"] = get_credential_provider().status()
+    status["gmail_watch"] = gmail_watch.status()
+    status["scheduler"] = scheduler.status() if scheduler is not None else None
+    status["jobs"] = jobs.status()
+    return status
+
+
+@app.get("/runs")
+async def runs(
+    limit: int = Query(20, ge=1),
+    token: str = Depends(verify_token),
+):
+    """Summaries of the most recent sync runs, newest first."""
+    return {"runs": [report.summary() for report in run_history.recent(limit)]}
+
+
+@app.get("/runs/{run_id}")
+async def run_detail(run_id: str, token: str = Depends(verify_token)):
+    """The full report of one run, including per-assignment outcomes."""
+    report = run_history.get(run_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Unknown run id")
+    return report.to_dict()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics(token: str = Depends(verify_token)):
+    """Stage timings, API call, retry, 429 and cache counters in Prometheus text format."""
+    return PlainTextResponse(
+        render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
 @app.get("/", response_class=HTMLResponse)
 async def root():
         return """
@@ -188,17 +292,43 @@ async def root():
 
 
 async def schedule_sync():
-    async with aiohttp.ClientSession() as session:
-        # Add authorization header for scheduled sync
-        headers = {"Authorization": f"Bearer {API_SECRET}"}
-        while True:
-            await asyncio.sleep(180)  # Wait for 3 minutes
-            try:
-                base_url = os.getenv("API_URL", "http://localhost:8888").rstrip("/")
-                async with session.post(f"{base_url}/trigger-sync", headers=headers) as response:
-                    print(f"Scheduled sync triggered. Response: {response.status}")
-            except Exception as e:
-                print(f"Error triggering scheduled sync: {e}")
+    # Calls the pipeline directly; the result decides the next interval
+    job = jobs.tracked("scheduled-sync", lambda: run_sync(None, "scheduler"))
+    await scheduler.run_forever_async(job)
+
+
+async def maintain_watch():
+    while True:
+        try:
+            await asyncio.to_thread(gmail_watch.ensure)
+        except Exception as e:
+            print(f"Error registering Gmail watch: {e}")
+        await asyncio.sleep(WATCH_CHECK_SECONDS)
+
+
+@app.post("/gmail/push")
+async def gmail_push(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    token: Optional[str] = Query(None),
+):
+    """Pub/Sub push endpoint for the Gmail watch."""
+    if not GMAIL_PUSH_TOKEN or token != GMAIL_PUSH_TOKEN:
+        raise HTTPException(status_code=401, detail="Invalid push token")
+    try:
+        envelope = await request.json()
+    except ValueError:
+        envelope = None
+    # Always acknowledge, otherwise Pub/Sub keeps redelivering bad messages
+    push = decode_push(envelope) if isinstance(envelope, dict) else None
+    if push is None:
+        return {"status": "ignored"}
+    _, history_id = push
+    if not gmail_watch.should_sync(history_id):
+        return {"status": "ignored", "history_id": history_id}
+    # New mail is known to exist, so don't just attach to a sync already running
+    background_tasks.add_task(coordinator.run, None, trigger="gmail-push", follow_up=True)
+    return {"status": "sync scheduled", "history_id": history_id}
 
 
 @app.post("/test")
@@ -206,7 +336,7 @@ async def test(
     after_date: Optional[str] = Query(None),
     token: str = Depends(verify_token)
 ):
-    result = await run_sync(after_date)
+    result = await run_sync(after_date, "test")
     return result
 
 
@@ -1,15 +1,18 @@
-import schedule
-import time
-from main import main
+import logging
+from main import run_with_report
+from services.adaptive_scheduler import AdaptiveSchedule, AdaptiveScheduler
 
 
 def job():
     print("Running Classroom to Notion sync...")
-    main()
+    result, _ = run_with_report(trigger="scheduler")
+    return result
 
 
-schedule.every(10).seconds.do(job)
-
-while True:
-    schedule.run_pending()
-    time.sleep(1)
+# Guarded because parse worker processes re-import this module as __mp_main__
+if __name__ == "__main__":
+    # Polls every 10 seconds while assignments keep arriving and backs off
+    # (up to SYNC_MAX_INTERVAL_SECONDS) while the inbox is quiet
+    schedule = AdaptiveSchedule(min_interval=10, base_interval=10)
+    logging.info(f"Starting adaptive scheduler at a {schedule.interval:.0f}s interval")
+    AdaptiveScheduler(schedule).run_forever(job)
@@ -0,0 +1,235 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from services.utils import env_number
+
+DEFAULT_MIN_INTERVAL = 30
+DEFAULT_BASE_INTERVAL = 180
+DEFAULT_MAX_INTERVAL = 30 * 60
+DEFAULT_BACKOFF_FACTOR = 2.0
+DEFAULT_JITTER = 0.1
+DEFAULT_OFF_HOURS_FACTOR = 4.0
+
+WEEKDAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+
+
+def classify_result(result) -> str:
+    """
+    Reduce a pipeline result to "new" (assignments were created), "quiet"
+    (nothing to do) or "error".
+    """
+    if not isinstance(result, dict) or result.get("error"):
+        return "error"
+    if result.get("created", 0) > 0:
+        return "new"
+    if result.get("failed", 0) > 0:
+        return "error"
+    return "quiet"
+
+
+def _parse_hours(value):
+    """Parse "7-22" into (7, 22). The end hour is exclusive."""
+    start, end = value.split("-")
+    return int(start), int(end)
+
+
+def _parse_days(value):
+    """Parse "mon-fri" or "mon,wed,fri" into weekday numbers (Monday is 0)."""
+    days = set()
+    for part in value.lower().split(","):
+        part = part.strip()
+        if "-" in part:
+            first, last = (WEEKDAYS.index(day[:3]) for day in part.split("-"))
+            days.update(range(first, last + 1))
+        elif part:
+            days.add(WEEKDAYS.index(part[:3]))
+    return days
+
+
+class ActivityProfile:
+    """
+    Time-of-day profile: outside the active hours/days every interval is
+    multiplied by off_hours_factor. Teachers mostly post on school days, so
+    e.g. SYNC_ACTIVE_HOURS=7-22 and SYNC_ACTIVE_DAYS=mon-fri poll much less
+    at night and on weekends.
+    """
+
+    def __init__(self, hours=None, days=None, off_hours_factor=DEFAULT_OFF_HOURS_FACTOR):
+        self.hours = hours
+        self.days = days
+        self.off_hours_factor = off_hours_factor
+
+    @classmethod
+    def from_env(cls):
+        hours_raw = os.getenv("SYNC_ACTIVE_HOURS")
+        days_raw = os.getenv("SYNC_ACTIVE_DAYS")
+        try:
+            hours = _parse_hours(hours_raw) if hours_raw else None
+            days = _parse_days(days_raw) if days_raw else None
+        except ValueError:
+            logging.warning("Invalid SYNC_ACTIVE_HOURS/SYNC_ACTIVE_DAYS, ignoring the profile")
+            hours = days = None
+        return cls(
+            hours,
+            days,
+            env_number("SYNC_OFF_HOURS_FACTOR", DEFAULT_OFF_HOURS_FACTOR, float),
+        )
+
+    def is_active(self, now: datetime) -> bool:
+        if self.days is not None and now.weekday() not in self.days:
+            return False
+        if self.hours is not None:
+            start, end = self.hours
+            if start <= end:
+                return start <= now.hour < end
+            return now.hour >= start or now.hour < end  # e.g. 22-6
+        return True
+
+    def factor(self, now: datetime) -> float:
+        return 1.0 if self.is_active(now) else self.off_hours_factor
+
+
+class AdaptiveSchedule:
+    """
+    Decides how long to wait before the next sync.
+
+    A sync that created assignments drops the interval to min_interval, since
+    teachers tend to post in bursts. Quiet syncs and errors multiply it by
+    backoff_factor up to max_interval. Every delay is scaled by the activity
+    profile and randomized by +/- jitter so several deployments don't poll
+    in lockstep.
+    """
+
+    def __init__(
+        self,
+        min_interval: Optional[float] = None,
+        base_interval: Optional[float] = None,
+        max_interval: Optional[float] = None,
+        backoff_factor: Optional[float] = None,
+        jitter: Optional[float] = None,
+        profile: Optional[ActivityProfile] = None,
+    ):
+        self.min_interval = min_interval or env_number(
+            "SYNC_MIN_INTERVAL_SECONDS", DEFAULT_MIN_INTERVAL, float
+        )
+        self.base_interval = max(
+            self.min_interval,
+            base_interval
+            or env_number("SYNC_INTERVAL_SECONDS", DEFAULT_BASE_INTERVAL, float),
+        )
+        self.max_interval = max(
+            self.base_interval,
+            max_interval
+            or env_number("SYNC_MAX_INTERVAL_SECONDS", DEFAULT_MAX_INTERVAL, float),
+        )
+        self.backoff_factor = max(
+            1.0,
+            backoff_factor
+            or env_number("SYNC_BACKOFF_FACTOR", DEFAULT_BACKOFF_FACTOR, float),
+        )
+        if jitter is None:
+            jitter = env_number("SYNC_JITTER", DEFAULT_JITTER, float)
+        self.jitter = min(max(jitter, 0.0), 1.0)
+        self.profile = profile or ActivityProfile.from_env()
+        self.interval = self.base_interval
+
+    def record(self, outcome: str):
+        """Adjust the interval after a sync with outcome "new", "quiet" or "error"."""
+        if outcome == "new":
+            self.interval = self.min_interval
+        elif outcome == "error":
+            # Errors back off from at least the base interval
+            self.interval = min(
+                max(self.interval, self.base_interval) * self.backoff_factor,
+                self.max_interval,
+            )
+        else:
+            self.interval = min(self.interval * self.backoff_factor, self.max_interval)
+
+    def next_delay(self, now: Optional[datetime] = None) -> float:
+        delay = self.interval * self.profile.factor(now or datetime.now())
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+
+class AdaptiveScheduler:
+    """
+    Runs a sync job forever on an AdaptiveSchedule.
+
+    :param is_running: Optional callable; when it returns True at a tick (e.g.
+                       a sync started through the API is still going) the tick
+                       is skipped instead of queueing another run.
+    """
+
+    def __init__(
+        self,
+        schedule: Optional[AdaptiveSchedule] = None,
+        is_running: Optional[Callable[[], bool]] = None,
+    ):
+        self.schedule = schedule or AdaptiveSchedule()
+        self.is_running = is_running or (lambda: False)
+        self.ticks = 0
+        self.skipped = 0
+        self.last_outcome: Optional[str] = None
+        self.next_run_at: Optional[float] = None
+
+    def _after_run(self, result):
+        self.last_outcome = classify_result(result)
+        self.schedule.record(self.last_outcome)
+        logging.info(
+            f"Scheduled sync finished ({self.last_outcome}), next interval {self.schedule.interval:.0f}s"
+        )
+
+    def _next_delay(self):
+        delay = self.schedule.next_delay()
+        self.next_run_at = time.time() + delay
+        return delay
+
+    def run_forever(self, job: Callable[[], Any]):
+        """Blocking loop for standalone use (scheduler.py)."""
+        while True:
+            time.sleep(self._next_delay())
+            self.ticks += 1
+            if self.is_running():
+                self.skipped += 1
+                continue
+            try:
+                result = job()
+            except Exception as e:
+                logging.error(f"Scheduled sync failed: {str(e)}", exc_info=True)
+                result = None
+            self._after_run(result)
+
+    async def run_forever_async(self, job: Callable[[], Awaitable[Any]]):
+        """Event loop version for the FastAPI server."""
+        while True:
+            await asyncio.sleep(self._next_delay())
+            self.ticks += 1
+            if self.is_running():
+                self.skipped += 1
+                continue
+            try:
+                result = await job()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Scheduled sync failed: {str(e)}", exc_info=True)
+                result = None
+            self._after_run(result)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "interval_seconds": round(self.schedule.interval, 1),
+            "next_run_at": (
+                datetime.fromtimestamp(self.next_run_at).isoformat()
+                if self.next_run_at
+                else None
+            ),
+            "last_outcome": self.last_outcome,
+            "ticks": self.ticks,
+            "skipped": self.skipped,
+        }
@@ -0,0 +1,314 @@
+import asyncio
+import aiohttp
+import time
+from services.metrics import (
+    count_api_call,
+    count_rate_limited,
+    count_retry,
+    observe_stage,
+    time_stage,
+)
+from services.rate_limiter import TokenBucket, backoff_delay, parse_retry_after
+from services.tracing import span
+from services.utils import env_number
+
+GMAIL_API_URL = "https://gmail.googleapis.com/gmail/v1/users/me"
+# messages.get costs 5 of the 250 quota units Gmail allows per user per second
+DEFAULT_REQUESTS_PER_SECOND = 50.0
+DEFAULT_MAX_RETRIES = 5
+
+
+class GmailApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(f"Gmail API returned {status}: {message}")
+        self.status = status
+
+
+class AsyncClassroomClient:
+    """
+    asyncio counterpart of ClassroomDataManager's fetch path, built on aiohttp.
+
+    The ClassroomDataManager is still used for authentication, the stored
+    historyId, the search query and turning raw messages into records, so both
+    pipelines produce identical data.
+    """
+
+    def __init__(
+        self,
+        manager,
+        session: aiohttp.ClientSession,
+        max_concurrency=None,
+        rate_limiter=None,
+        max_retries=DEFAULT_MAX_RETRIES,
+    ):
+        self.manager = manager
+        self.session = session
+        self.semaphore = asyncio.Semaphore(max_concurrency or manager.max_workers)
+        self.auth_lock = asyncio.Lock()
+        self.rate_limiter = rate_limiter or TokenBucket(
+            env_number("GMAIL_RATE_LIMIT", DEFAULT_REQUESTS_PER_SECOND, float)
+        )
+        self.max_retries = max_retries
+
+    async def _headers(self):
+        async with self.auth_lock:
+            creds = self.manager.creds
+            if creds is None or not creds.valid:
+                await asyncio.to_thread(self.manager.authenticate)
+        return {"Authorization": f"Bearer {self.manager.creds.token}"}
+
+    async def _get(self, path, params=None, operation=None):
+        """
+        GET a Gmail API resource, with the retry rules of AsyncNotionClient:
+        429 responses pause the rate limiter for the Retry-After period, 5xx
+        responses are retried with exponential backoff and jitter.
+        """
+        # aiohttp rejects None values in query parameters
+        params = [(key, value) for key, value in (params or []) if value is not None]
+        for attempt in range(self.max_retries + 1):
+            retries_left = attempt < self.max_retries
+            await self.rate_limiter.acquire_async()
+            if attempt:
+                count_retry("gmail")
+            count_api_call("gmail", operation or path)
+            async with self.semaphore:
+                with span(f"gmail.{operation or path}", attempt=attempt):
+                    async with self.session.get(
+                        f"{GMAIL_API_URL}/{path}", params=params, headers=await self._headers()
+                    ) as response:
+                        status = response.status
+                        if status < 400:
+                            return await response.json()
+                        retry_after = response.headers.get("Retry-After")
+                        text = await response.text()
+
+            if status == 429:
+                count_rate_limited("gmail")
+            if status == 429 and retries_left:
+                delay = parse_retry_after(retry_after)
+                self.rate_limiter.pause(
+                    delay if delay is not None else backoff_delay(attempt)
+                )
+                continue
+            if status >= 500 and retries_left:
+                await asyncio.sleep(backoff_delay(attempt))
+                continue
+            raise GmailApiError(status, text)
+
+    async def get_history_id(self):
+        try:
+            profile = await self._get("profile", operation="getProfile")
+            return profile.get("historyId")
+        except (GmailApiError, aiohttp.ClientError) as error:
+            print(f"An error occurred while fetching the mailbox profile: {error}")
+            return None
+
+    async def get_history_message_ids(self, start_history_id):
+        """Async version of ClassroomDataManager.get_history_message_ids()."""
+        print(f"Fetching mailbox changes since history ID {start_history_id}...")
+        message_ids = []
+        seen = set()
+        latest_history_id = start_history_id
+        page_token = None
+        try:
+            while True:
+                results = await self._get(
+                    "history",
+                    [
+                        ("startHistoryId", start_history_id),
+                        ("historyTypes", "messageAdded"),
+                        ("pageToken", page_token),
+                    ],
+                    operation="history.list",
+                )
+                for record in results.get("history", []):
+                    for added in record.get("messagesAdded", []):
+                        message_id = added.get("message", {}).get("id")
+                        if message_id and message_id not in seen:
+                            seen.add(message_id)
+                            message_ids.append(message_id)
+                latest_history_id = results.get("historyId", latest_history_id)
+                page_token = results.get("nextPageToken")
+                if not page_token:
+                    break
+        except (GmailApiError, aiohttp.ClientError) as error:
+            if isinstance(error, GmailApiError) and error.status == 404:
+                print("Stored history ID has expired, falling back to a full search.")
+            else:
+                print(f"An error occurred while fetching mailbox history: {error}")
+            return None
+
+        print(f"Found {len(message_ids)} new messages since last sync.")
+        return message_ids, latest_history_id
+
+    async def iter_message_pages(self, after_date=None, page_size=None):
+        """Async version of ClassroomDataManager.iter_message_pages()."""
+        query = self.manager.build_query(after_date)
+        print(f"Using search query: {query}")
+        page_size = min(page_size or self.manager.page_size, self.manager.MAX_PAGE_SIZE)
+        page_token = None
+        while True:
+            with time_stage("list"):
+                results = await self._get(
+                    "messages",
+                    [("q", query), ("maxResults", page_size), ("pageToken", page_token)],
+                    operation="messages.list",
+                )
+            messages = results.get("messages", [])
+            print(f"Fetched a page of {len(messages)} classroom assignment messages.")
+            yield messages
+            page_token = results.get("nextPageToken")
+            if not page_token:
+                break
+
+    async def get_message_details(
+        self, message_id, max_retries=3, retry_delay=5, options=None
+    ):
+        print(f"Fetching details for message ID: {message_id}")
+        params = []
+        for key, value in (options or self.manager.FULL_MESSAGE_OPTIONS).items():
+            values = value if isinstance(value, list) else [value]
+            params.extend((key, item) for item in values)
+        for attempt in range(max_retries):
+            try:
+                message = await self._get(
+                    f"messages/{message_id}", params, operation="messages.get"
+                )
+                print(f"Successfully fetched details for message ID: {message_id}")
+                return message
+            except asyncio.TimeoutError:
+                if attempt < max_retries - 1:
+                    print(
+                        f"Timeout error occurred. Retrying in {retry_delay} seconds..."
+                    )
+                    count_retry("gmail")
+                    await asyncio.sleep(retry_delay)
+                else:
+                    print(
+                        f"Failed to fetch details for message ID: {message_id} after {max_retries} attempts."
+                    )
+                    self.manager.record_fetch_error()
+                    return None
+            except (GmailApiError, aiohttp.ClientError) as error:
+                print(f"An error occurred while fetching message details: {error}")
+                # A 404 means the mail was deleted since it was listed
+                if not (isinstance(error, GmailApiError) and error.status == 404):
+                    self.manager.record_fetch_error()
+                return None
+
+    async def select_relevant_ids(self, message_ids, filter_criteria):
+        """Async version of ClassroomDataManager.select_relevant_ids()."""
+        if not filter_criteria:
+            return list(message_ids)
+        with time_stage("metadata_fetch"):
+            metadata = await asyncio.gather(
+                *(
+                    self.get_message_details(
+                        message_id, options=self.manager.METADATA_OPTIONS
+                    )
+                    for message_id in message_ids
+                )
+            )
+        return [
+            details["id"]
+            for details in metadata
+            if details and self.manager.filter_message(details, filter_criteria)
+        ]
+
+    async def get_messages_to_fetch(self, after_date=None, incremental=True):
+        """Async version of ClassroomDataManager.get_messages_to_fetch()."""
+        manager = self.manager
+        manager.last_sync_incremental = False
+        start_history_id = manager.sync_state.get("history_id")
+        if incremental and after_date is None and start_history_id:
+            changes = await self.get_history_message_ids(start_history_id)
+            if changes is not None:
+                message_ids, history_id = changes
+                manager.last_sync_incremental = True
+
+                async def single_page():
+                    yield [{"id": message_id} for message_id in message_ids]
+
+                return single_page(), history_id
+
+        history_id = await self.get_history_id()
+        print("Fetching all classroom assignment messages...")
+        return self.iter_message_pages(after_date), history_id
+
+    async def run(
+        self,
+        after_date=None,
+        filter_criteria=None,
+        incremental=True,
+        known_messages=None,
+    ):
+        """
+        Async version of ClassroomDataManager.run().
+
+        Detail fetches for a page are started as soon as that page arrives, so
+        they overlap with listing the following pages.
+        """
+        print("Starting AsyncClassroomClient...")
+        manager = self.manager
+        manager.fetch_errors = 0
+        known = {message["id"]: message for message in known_messages or []}
+        pages, history_id = await self.get_messages_to_fetch(after_date, incremental)
+
+        listed = []
+        fetches = {}
+        fetch_started = None
+        try:
+            async for messages in pages:
+                to_fetch = []
+                for message in messages:
+                    listed.append(message["id"])
+                    if message["id"] not in known and message["id"] not in fetches:
+                        to_fetch.append(message["id"])
+                if manager.last_sync_incremental:
+                    # The History API reports every new mail, not just search
+                    # hits, so check the headers before downloading bodies
+                    to_fetch = await self.select_relevant_ids(to_fetch, filter_criteria)
+                if to_fetch and fetch_started is None:
+                    fetch_started = time.perf_counter()
+                for message_id in to_fetch:
+                    fetches[message_id] = asyncio.create_task(
+                        self.get_message_details(message_id)
+                    )
+        except (GmailApiError, aiohttp.ClientError) as error:
+            print(f"An error occurred while fetching messages: {error}")
+            manager.record_fetch_error()
+
+        details_list = await asyncio.gather(*fetches.values())
+        if fetch_started is not None:
+            # Detail fetches overlap with listing, so this spans both
+            observe_stage("detail_fetch", time.perf_counter() - fetch_started)
+        details_by_id = dict(zip(fetches.keys(), details_list))
+        print(f"Total messages fetched: {len(listed)}")
+
+        processed_messages = []
+        for message_id in listed:
+            if message_id in known:
+                processed_messages.append(known[message_id])
+                continue
+            if message_id not in details_by_id:
+                continue  # Not Classroom mail
+            details = details_by_id[message_id]
+            if details:
+                processed_messages.append(manager.build_message_record(details))
+            else:
+                print(f"Could not fetch details for message ID: {message_id}")
+
+        print(f"Total processed messages: {len(processed_messages)}")
+        manager.report_fetch_counts(
+            len(listed),
+            sum(1 for message_id in listed if message_id in known),
+            len(processed_messages),
+        )
+        if history_id and manager.fetch_errors == 0:
+            await asyncio.to_thread(manager.sync_state.set, "history_id", history_id)
+
+        if processed_messages:
+            print(f"Processed {len(processed_messages)} messages.")
+            return processed_messages
+        print("No messages were processed. Check the logs for errors.")
+        return None
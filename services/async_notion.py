@@ -0,0 +1,96 @@
+import asyncio
+import json
+import os
+import aiohttp
+from typing import List, Dict, Any, Optional
+from services.notion import (
+    DEFAULT_MAX_CONCURRENCY,
+    DEFAULT_MAX_RETRIES,
+    DEFAULT_REQUESTS_PER_SECOND,
+)
+from services.rate_limiter import TokenBucket, backoff_delay, parse_retry_after
+from services.metrics import count_api_call, count_rate_limited, count_retry
+from services.tracing import span
+from services.utils import env_number
+
+
+class AsyncNotionClient:
+    """aiohttp counterpart of NotionDatabaseManager.post_data()."""
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        database_id: str,
+        token: str = None,
+        rate_limiter: Optional[TokenBucket] = None,
+        max_concurrency: Optional[int] = None,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+    ):
+        self.session = session
+        self.database_id = database_id
+        self.token = token or os.environ.get("NOTION_TOKEN")
+        self.base_url = "https://api.notion.com/v1"
+        self.headers = {
+            "Authorization": f"Bearer {self.token}",
+            "Notion-Version": "2022-06-28",
+            "Content-Type": "application/json",
+        }
+        self.rate_limiter = rate_limiter or TokenBucket(
+            env_number("NOTION_RATE_LIMIT", DEFAULT_REQUESTS_PER_SECOND, float)
+        )
+        self.max_concurrency = max(
+            1,
+            max_concurrency
+            or env_number("NOTION_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY),
+        )
+        self.max_retries = max_retries
+
+    async def create_page(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """Create a single page with the same retry rules as NotionDatabaseManager.create_page()."""
+        url = f"{self.base_url}/pages/"
+        for attempt in range(self.max_retries + 1):
+            retries_left = attempt < self.max_retries
+            await self.rate_limiter.acquire_async()
+            if attempt:
+                count_retry("notion")
+            count_api_call("notion", "post")
+            try:
+                with span("notion.post", url=url, attempt=attempt):
+                    async with self.session.post(
+                        url, json=item, headers=self.headers
+                    ) as response:
+                        status = response.status
+                        retry_after = response.headers.get("Retry-After")
+                        text = await response.text()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+                if retries_left:
+                    await asyncio.sleep(backoff_delay(attempt))
+                    continue
+                return {"object": "error", "status": None, "message": str(error)}
+
+            if status == 429:
+                count_rate_limited("notion")
+            if status == 429 and retries_left:
+                delay = parse_retry_after(retry_after)
+                self.rate_limiter.pause(
+                    delay if delay is not None else backoff_delay(attempt)
+                )
+                continue
+            if status >= 500 and retries_left:
+                await asyncio.sleep(backoff_delay(attempt))
+                continue
+
+            try:
+                return json.loads(text)
+            except ValueError:
+                return {"object": "error", "status": status, "message": text}
+
+    async def post_data(self, data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Create pages concurrently; responses are returned in the same order as data."""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def create(item):
+            async with semaphore:
+                return await self.create_page(item)
+
+        return list(await asyncio.gather(*(create(item) for item in data)))
@@ -1,12 +1,89 @@
 import json
 import os
+import hashlib
 import logging
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from services.metrics import count_cache
 
 
-class NotionCache:
+def page_metadata(item):
+    """The compact metadata kept per cached assignment instead of the full page body."""
+    properties = item.get("properties", {})
+    title = properties.get("Name", {}).get("title") or [{}]
+    course = properties.get("Course", {}).get("select") or {}
+    due = properties.get("Due", {}).get("date") or {}
+    return {
+        "title": title[0].get("text", {}).get("content"),
+        "course": course.get("name"),
+        "url": properties.get("URL", {}).get("url"),
+        "due": due.get("start"),
+    }
+
+
+def normalize_due(due):
+    """
+    Reduce a due date to its wall-clock minute.
+
+    The posted payload says "2025-10-20T23:59:00" while Notion returns the same
+    date as "2025-10-20T23:59:00.000-04:00"; both become "2025-10-20T23:59".
+    """
+    if not due:
+        return due
+    try:
+        parsed = datetime.fromisoformat(due.replace("Z", "+00:00"))
+    except ValueError:
+        return due
+    return parsed.replace(tzinfo=None).isoformat(timespec="minutes")
+
+
+def metadata_key(metadata):
+    """
+    Stable identity of an assignment.
+
+    The Classroom assignment link is unique per assignment, so it is used when
+    present. Otherwise a hash of title, course and due date stands in, which
+    still keeps same-titled assignments from different courses apart.
+    """
+    url = metadata.get("url")
+    if url and url != "Not found":
+        return f"url:{url}"
+    fields = (metadata.get("title"), metadata.get("course"), normalize_due(metadata.get("due")))
+    content = "\x1f".join(str(field or "") for field in fields)
+    return "hash:" + hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def page_key(item):
+    return metadata_key(page_metadata(item))
+
+
+def is_stable_key(key):
+    return key.startswith(("url:", "hash:"))
+
+
+def normalize_entry(key, value):
+    """Turn a legacy (assignment name -> page or metadata) entry into (stable key, metadata)."""
+    if not isinstance(value, dict):
+        value = {}
+    metadata = page_metadata(value) if "properties" in value else dict(value)
+    if key.startswith("hash:"):
+        # Recomputed in case the hashed fields are normalized differently now
+        return metadata_key(metadata), metadata
+    if is_stable_key(key):
+        return key, metadata
+    metadata.setdefault("title", key)
+    return metadata_key(metadata), metadata
+
+
+class JsonCacheBackend:
+    """Keeps the cache in a single JSON file that is rewritten on every change."""
+
     def __init__(self, cache_file="cache/notion_cache.json"):
         self.cache_file = cache_file
-        self.cache = self.load_cache()
+        self.cache = dict(
+            normalize_entry(key, value) for key, value in self.load_cache().items()
+        )
 
     def load_cache(self):
         if os.path.exists(self.cache_file):
@@ -36,20 +113,223 @@ class NotionCache:
         with open(self.cache_file, "w") as f:
             json.dump(self.cache, f, indent=2)
 
-    def add_to_cache(self, data):
-        for item in data:
-            key = item["properties"]["Name"]["title"][0]["text"]["content"]
-            self.cache[key] = item
+    def __contains__(self, key):
+        return key in self.cache
+
+    def __len__(self):
+        return len(self.cache)
+
+    def add_many(self, entries):
+        """Store (key, metadata) pairs."""
+        for key, metadata in entries:
+            self.cache[key] = metadata
         self.save_cache()
 
+    def close(self):
+        pass
+
+
+class SqliteCacheBackend:
+    """
+    Keeps the cache in an indexed SQLite table.
+
+    Membership checks are primary key lookups and new entries are written in a
+    single transaction, so the cost of a sync no longer grows with the size of
+    the cache.
+    """
+
+    # 1: keyed by assignment name, 2: keyed by stable identity with page_id,
+    # 3: hash keys built from the normalized due date
+    SCHEMA_VERSION = 3
+
+    def __init__(self, db_file="cache/notion_cache.db"):
+        self.db_file = db_file
+        directory = os.path.dirname(db_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # The async pipeline builds the cache on the event loop thread and uses
+        # it from a worker thread, so access is serialized with our own lock
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with self.conn:
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS assignments (
+                    key TEXT PRIMARY KEY,
+                    title TEXT,
+                    course TEXT,
+                    url TEXT,
+                    due TEXT,
+                    added_at TEXT NOT NULL,
+                    page_id TEXT
+                )
+                """
+            )
+            version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+            if version == 1:
+                self.conn.execute("ALTER TABLE assignments ADD COLUMN page_id TEXT")
+            if 0 < version < self.SCHEMA_VERSION:
+                self._rekey()
+            self.conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+
+    def _rekey(self):
+        """Recompute every key from the stored metadata after the key format changed."""
+        rows = self.conn.execute(
+            "SELECT key, title, course, url, due, added_at, page_id FROM assignments"
+        ).fetchall()
+        self.conn.execute("DELETE FROM assignments")
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO assignments "
+            "(key, title, course, url, due, added_at, page_id) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    metadata_key({"title": title, "course": course, "url": url, "due": due}),
+                    title,
+                    course,
+                    url,
+                    due,
+                    added_at,
+                    page_id,
+                )
+                for _, title, course, url, due, added_at, page_id in rows
+            ],
+        )
+
+    def __contains__(self, key):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT 1 FROM assignments WHERE key = ?", (key,)
+            ).fetchone()
+        return row is not None
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM assignments").fetchone()[0]
+
+    def add_many(self, entries):
+        """Store (key, metadata) pairs in one transaction."""
+        added_at = datetime.now(timezone.utc).isoformat()
+        rows = [
+            (
+                key,
+                metadata.get("title"),
+                metadata.get("course"),
+                metadata.get("url"),
+                metadata.get("due"),
+                added_at,
+                metadata.get("page_id"),
+            )
+            for key, metadata in entries
+        ]
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO assignments "
+                "(key, title, course, url, due, added_at, page_id) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def migrate_json_cache(json_file, backend):
+    """
+    Import a legacy JSON cache (assignment name -> Notion page) into a backend.
+
+    The JSON file is renamed to <name>.migrated afterwards so it is only
+    imported once.
+    """
+    if not os.path.exists(json_file):
+        return 0
+    entries = list(JsonCacheBackend(json_file).cache.items())
+    if entries:
+        backend.add_many(entries)
+    os.replace(json_file, json_file + ".migrated")
+    logging.info(f"Migrated {len(entries)} entries from {json_file} to the cache database")
+    return len(entries)
+
+
+def create_backend(kind=None, cache_file=None):
+    """Create the cache backend selected by NOTION_CACHE_BACKEND (sqlite or json)."""
+    kind = (kind or os.getenv("NOTION_CACHE_BACKEND", "sqlite")).lower()
+    if kind == "json":
+        return JsonCacheBackend(cache_file or "cache/notion_cache.json")
+    backend = SqliteCacheBackend(cache_file or "cache/notion_cache.db")
+    legacy_file = os.path.join(
+        os.path.dirname(backend.db_file) or ".", "notion_cache.json"
+    )
+    migrate_json_cache(legacy_file, backend)
+    return backend
+
+
+class NotionCache:
+    """
+    Remembers which assignments already exist in Notion.
+
+    filter_with_cache() only reads the cache; entries are written by commit()
+    once Notion has confirmed the page was created, so a failed post is retried
+    on the next run instead of being marked as done forever.
+    """
+
+    def __init__(self, cache_file=None, backend=None):
+        self.backend = backend or create_backend(cache_file=cache_file)
+
+    def add_to_cache(self, data):
+        self.backend.add_many([(page_key(item), page_metadata(item)) for item in data])
+
     def filter_with_cache(self, data):
         new_data = []
+        seen = set()
         for item in data:
-            key = item["properties"]["Name"]["title"][0]["text"]["content"]
-            if key not in self.cache:
+            key = page_key(item)
+            # Also drop duplicates within the same batch
+            if key not in seen and key not in self.backend:
+                seen.add(key)
                 new_data.append(item)
 
-        if new_data:
-            self.add_to_cache(new_data)
-
+        count_cache("notion", hits=len(data) - len(new_data), misses=len(new_data))
         return new_data if new_data else None
+
+    def commit(self, data, responses):
+        """
+        Cache the pages Notion confirmed as created, in one batch.
+
+        :param data: The page payloads that were posted
+        :param responses: The Notion responses, in the same order as data
+        :return: The number of pages cached
+        """
+        entries = []
+        for item, response in zip(data, responses):
+            if isinstance(response, dict) and response.get("object") == "page":
+                metadata = page_metadata(item)
+                metadata["page_id"] = response.get("id")
+                entries.append((page_key(item), metadata))
+        if entries:
+            self.backend.add_many(entries)
+        return len(entries)
+
+    def is_empty(self):
+        return len(self.backend) == 0
+
+    def reconcile(self, pages):
+        """
+        Add pages that already exist in the Notion database to the cache.
+
+        :param pages: Page objects as returned by a database query
+        :return: The number of pages cached
+        """
+        entries = []
+        for page in pages:
+            metadata = page_metadata(page)
+            metadata["page_id"] = page.get("id")
+            entries.append((metadata_key(metadata), metadata))
+        if entries:
+            self.backend.add_many(entries)
+        return len(entries)
+
+    def close(self):
+        self.backend.close()
@@ -1,21 +1,81 @@
-import re
+import os
 import json
 import time
-import base64
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from googleapiclient.discovery import build
+import google_auth_httplib2
 from googleapiclient.errors import HttpError
-from services.google_auth import Authenticator
+from googleapiclient.http import build_http
+from services.google_auth import get_credential_provider
+from services.gmail_service import get_gmail_service
+from services.sync_state import SyncState
+from services.email_extractor import extract_assignments
+from services.mime import LazyPart, decode_body
+from services.metrics import (
+    count_api_call,
+    count_rate_limited,
+    count_retry,
+    time_stage,
+)
+from services.run_report import report_count
+from services.tracing import propagate_context, span
+from services.utils import env_number
+
+
+# How long either side of the prefetch queue waits before checking that the
+# other side is still there
+PREFETCH_POLL_SECONDS = 0.5
 
 
 class ClassroomDataManager:
     SCOPES = ["https://mail.google.com/#search/new+assignment"]
-
-    def __init__(self, credentials_file="credentials.json", token_file="token.json"):
+    # Gmail accepts up to 100 calls per batch but recommends at most 50
+    MAX_BATCH_SIZE = 100
+    MAX_PAGE_SIZE = 500
+    # Request options for messages.get: the full message minus fields we never
+    # use, or just the headers needed to decide whether a message is relevant
+    FULL_MESSAGE_OPTIONS = {
+        "format": "full",
+        "fields": "id,threadId,labelIds,snippet,payload",
+    }
+    METADATA_OPTIONS = {
+        "format": "metadata",
+        "metadataHeaders": ["From", "Subject"],
+        "fields": "id,threadId,labelIds,payload/headers",
+    }
+    # Only these parts keep their decoded body in the stored message records
+    BODY_MIME_TYPES = ("text/html",)
+
+    def __init__(
+        self,
+        credentials_file="credentials.json",
+        token_file="token.json",
+        state_file="cache/gmail_state.json",
+        fetch_mode=None,
+        batch_size=None,
+        max_workers=None,
+        page_size=None,
+    ):
         self.credentials_file = credentials_file
         self.token_file = token_file
         self.creds = None
         self.service = None
+        # How message details are downloaded: "batch", "parallel" or "sequential"
+        self.fetch_mode = (fetch_mode or os.getenv("GMAIL_FETCH_MODE", "batch")).lower()
+        self.batch_size = min(
+            batch_size or env_number("GMAIL_BATCH_SIZE", 50), self.MAX_BATCH_SIZE
+        )
+        self.max_workers = max(1, max_workers or env_number("GMAIL_MAX_WORKERS", 8))
+        self.page_size = page_size or env_number("GMAIL_PAGE_SIZE", 100)
+        # httplib2 is not thread-safe, so every worker thread gets its own http
+        self._thread_local = threading.local()
+        self._lock = threading.Lock()
+        self.sync_state = SyncState(state_file)
+        # True when the last run only fetched changes via the History API
+        self.last_sync_incremental = False
+        self.fetch_errors = 0
 
     def save_to_json(self, data, filename):
         # if the data type is a list, we need to convert it to a dictionary
@@ -25,45 +85,214 @@ class ClassroomDataManager:
         print(f"Data saved to {filename}")
 
     def authenticate(self):
-        auth = Authenticator(self.credentials_file)
-        self.creds = auth.get_credentials()
+        with time_stage("auth"):
+            provider = get_credential_provider(self.credentials_file, self.token_file)
+            self.creds = provider.get_credentials()
         return self.creds
 
-    def get_messages(self, after_date=None):
-        print("Fetching all classroom assignment messages...")
+    def build_query(self, after_date=None):
         # Default to the day before today if no date provided
         if after_date is None:
             yesterday = datetime.now() - timedelta(days=1)
             after_date = yesterday.strftime("%Y/%m/%d")
 
         # Search query to get ALL classroom assignment emails after the specified date
-        query = f'from:no-reply@classroom.google.com subject:"New assignment:" after:{after_date}'
-        print(f"Using search query: {query}")
+        return f'from:no-reply@classroom.google.com subject:"New assignment:" after:{after_date}'
 
-        try:
-            results = (
-                self.service.users().messages().list(userId="me", q=query).execute()
-            )
+    def iter_message_pages(self, after_date=None, page_size=None, http=None):
+        """
+        Yield the message stubs matching the search one result page at a time.
+
+        Follows nextPageToken until the listing is exhausted, so nothing past the
+        first page is dropped.
+
+        :param page_size: maxResults per messages.list call (Gmail allows up to 500)
+        :param http: Optional http object to execute the requests with
+        """
+        query = self.build_query(after_date)
+        print(f"Using search query: {query}")
+        page_size = min(page_size or self.page_size, self.MAX_PAGE_SIZE)
+        page_token = None
+        while True:
+            count_api_call("gmail", "messages.list")
+            with time_stage("list"), span("gmail.messages.list"):
+                results = (
+                    self.service.users()
+                    .messages()
+                    .list(
+                        userId="me", q=query, maxResults=page_size, pageToken=page_token
+                    )
+                    .execute(http=http)
+                )
             messages = results.get("messages", [])
-            print(f"Fetched {len(messages)} classroom assignment messages.")
+            print(f"Fetched a page of {len(messages)} classroom assignment messages.")
+            yield messages
+            page_token = results.get("nextPageToken")
+            if not page_token:
+                break
 
-            # Save fetched messages
+    def prefetch_message_pages(self, after_date=None, page_size=None):
+        """
+        Like iter_message_pages(), but lists on a background thread so the next
+        page is already in flight while the caller works on the current one.
+        """
+        pages = queue.Queue(maxsize=2)
+        stop = threading.Event()
+        done = object()
+
+        def put(item):
+            # Gives up once the consumer is gone instead of blocking forever
+            while not stop.is_set():
+                try:
+                    pages.put(item, timeout=PREFETCH_POLL_SECONDS)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def producer():
+            try:
+                http = self._thread_http()
+                for page in self.iter_message_pages(after_date, page_size, http=http):
+                    if not put(page):
+                        return
+            except Exception as error:
+                put(error)
+            finally:
+                put(done)
+
+        thread = threading.Thread(target=propagate_context(producer), daemon=True)
+        thread.start()
+        try:
+            while True:
+                try:
+                    page = pages.get(timeout=PREFETCH_POLL_SECONDS)
+                except queue.Empty:
+                    if not thread.is_alive() and pages.empty():
+                        raise RuntimeError("Message listing thread exited without finishing")
+                    continue
+                if page is done:
+                    return
+                if isinstance(page, Exception):
+                    raise page
+                yield page
+        finally:
+            stop.set()
+            while True:
+                try:
+                    pages.get_nowait()
+                except queue.Empty:
+                    break
 
+    def get_messages(self, after_date=None):
+        print("Fetching all classroom assignment messages...")
+        try:
+            messages = [
+                message
+                for page in self.iter_message_pages(after_date)
+                for message in page
+            ]
+            print(f"Fetched {len(messages)} classroom assignment messages.")
             return messages
         except HttpError as error:
             print(f"An error occurred while fetching messages: {error}")
+            self.record_fetch_error()
             return []
 
-    def get_message_details(self, message_id, max_retries=3, retry_delay=5):
+    def get_history_id(self):
+        """Return the mailbox's current historyId, or None if it can't be read."""
+        try:
+            count_api_call("gmail", "getProfile")
+            with span("gmail.getProfile"):
+                profile = self.service.users().getProfile(userId="me").execute()
+            return profile.get("historyId")
+        except HttpError as error:
+            print(f"An error occurred while fetching the mailbox profile: {error}")
+            return None
+
+    def get_history_message_ids(self, start_history_id):
+        """
+        List the IDs of messages added to the mailbox since a history ID.
+
+        :param start_history_id: The historyId recorded by the previous sync
+        :return: A (message_ids, latest_history_id) tuple, or None when the history
+                 ID has expired (or the call failed) and a full search is required
+        """
+        print(f"Fetching mailbox changes since history ID {start_history_id}...")
+        message_ids = []
+        seen = set()
+        latest_history_id = start_history_id
+        page_token = None
+        try:
+            while True:
+                count_api_call("gmail", "history.list")
+                with span("gmail.history.list"):
+                    results = (
+                        self.service.users()
+                        .history()
+                        .list(
+                            userId="me",
+                            startHistoryId=start_history_id,
+                            historyTypes=["messageAdded"],
+                            pageToken=page_token,
+                        )
+                        .execute()
+                    )
+                for record in results.get("history", []):
+                    for added in record.get("messagesAdded", []):
+                        message_id = added.get("message", {}).get("id")
+                        if message_id and message_id not in seen:
+                            seen.add(message_id)
+                            message_ids.append(message_id)
+                latest_history_id = results.get("historyId", latest_history_id)
+                page_token = results.get("nextPageToken")
+                if not page_token:
+                    break
+        except HttpError as error:
+            if error.resp.status == 404:
+                print("Stored history ID has expired, falling back to a full search.")
+            else:
+                print(f"An error occurred while fetching mailbox history: {error}")
+            return None
+
+        print(f"Found {len(message_ids)} new messages since last sync.")
+        return message_ids, latest_history_id
+
+    def report_fetch_counts(self, listed, reused, processed):
+        """Add this run's fetch counts to the active run report."""
+        report_count("messages_listed", listed)
+        report_count("messages_reused", reused)
+        report_count("messages_processed", processed)
+        report_count("fetch_errors", self.fetch_errors)
+
+    def record_fetch_error(self):
+        with self._lock:
+            self.fetch_errors += 1
+
+    def _thread_http(self):
+        """Return an authorized http object owned by the calling thread."""
+        http = getattr(self._thread_local, "http", None)
+        if http is None:
+            # build_http() sets the same socket timeout build() would use
+            http = google_auth_httplib2.AuthorizedHttp(self.creds, http=build_http())
+            self._thread_local.http = http
+        return http
+
+    def get_message_details(
+        self, message_id, max_retries=3, retry_delay=5, http=None, options=None
+    ):
         print(f"Fetching details for message ID: {message_id}")
+        options = options or self.FULL_MESSAGE_OPTIONS
         for attempt in range(max_retries):
+            count_api_call("gmail", "messages.get")
             try:
-                message = (
-                    self.service.users()
-                    .messages()
-                    .get(userId="me", id=message_id)
-                    .execute()
-                )
+                with span("gmail.messages.get", message_id=message_id, attempt=attempt):
+                    message = (
+                        self.service.users()
+                        .messages()
+                        .get(userId="me", id=message_id, **options)
+                        .execute(http=http)
+                    )
                 print(f"Successfully fetched details for message ID: {message_id}")
                 return message
             except TimeoutError:
@@ -71,33 +300,216 @@ class ClassroomDataManager:
                     print(
                         f"Timeout error occurred. Retrying in {retry_delay} seconds..."
                     )
+                    count_retry("gmail")
                     time.sleep(retry_delay)
                 else:
                     print(
                         f"Failed to fetch details for message ID: {message_id} after {max_retries} attempts."
                     )
+                    self.record_fetch_error()
                     return None
             except HttpError as error:
                 print(f"An error occurred while fetching message details: {error}")
+                # A 404 means the mail was deleted since it was listed, retrying won't help
+                if error.resp.status != 404:
+                    self.record_fetch_error()
                 return None
 
+    def get_message_details_batch(
+        self, message_ids, batch_size=None, max_retries=3, retry_delay=5, options=None
+    ):
+        """
+        Fetch message details using Gmail HTTP batch requests.
+
+        Behaves like calling get_message_details() for every ID: timeouts are
+        retried, other errors give None for that message only.
+
+        :param message_ids: The IDs of the messages to fetch
+        :param batch_size: Number of messages per batch request
+        :return: A list of message details (or None) in the same order as message_ids
+        """
+        batch_size = min(batch_size or self.batch_size, self.MAX_BATCH_SIZE)
+        options = options or self.FULL_MESSAGE_OPTIONS
+        results = {}
+        unique_ids = list(dict.fromkeys(message_ids))
+
+        for start in range(0, len(unique_ids), batch_size):
+            pending = unique_ids[start : start + batch_size]
+            print(
+                f"Fetching details for {len(pending)} messages in one batch request..."
+            )
+            for attempt in range(max_retries):
+                retry = []
+
+                def callback(request_id, response, exception):
+                    if exception is None:
+                        results[request_id] = response
+                    elif isinstance(exception, HttpError) and exception.resp.status == 429:
+                        # Too many concurrent requests in the batch, try again later
+                        count_rate_limited("gmail")
+                        retry.append(request_id)
+                    else:
+                        print(
+                            f"An error occurred while fetching message details for {request_id}: {exception}"
+                        )
+                        results[request_id] = None
+                        if not (
+                            isinstance(exception, HttpError)
+                            and exception.resp.status == 404
+                        ):
+                            self.record_fetch_error()
+
+                batch = self.service.new_batch_http_request(callback=callback)
+                for message_id in pending:
+                    batch.add(
+                        self.service.users()
+                        .messages()
+                        .get(userId="me", id=message_id, **options),
+                        request_id=message_id,
+                    )
+                count_api_call("gmail", "batch")
+                count_api_call("gmail", "messages.get", len(pending))
+                try:
+                    with span("gmail.batch", size=len(pending), attempt=attempt):
+                        batch.execute()
+                except TimeoutError:
+                    retry = [mid for mid in pending if mid not in results]
+                except HttpError as error:
+                    print(f"An error occurred while executing batch request: {error}")
+                    retry = []
+                    for message_id in pending:
+                        if message_id not in results:
+                            results[message_id] = None
+                            self.record_fetch_error()
+
+                pending = retry
+                if not pending:
+                    break
+                if attempt < max_retries - 1:
+                    print(
+                        f"{len(pending)} messages could not be fetched. Retrying in {retry_delay} seconds..."
+                    )
+                    count_retry("gmail", len(pending))
+                    time.sleep(retry_delay)
+
+            for message_id in pending:
+                print(
+                    f"Failed to fetch details for message ID: {message_id} after {max_retries} attempts."
+                )
+                results[message_id] = None
+                self.record_fetch_error()
+
+        return [results.get(message_id) for message_id in message_ids]
+
+    def get_message_details_parallel(self, message_ids, max_workers=None, options=None):
+        """
+        Fetch message details concurrently on a bounded thread pool.
+
+        Each worker uses its own authorized http object. Failures stay isolated
+        to the message that failed, exactly like get_message_details().
+
+        :param message_ids: The IDs of the messages to fetch
+        :param max_workers: Maximum number of requests in flight
+        :return: A list of message details (or None) in the same order as message_ids
+        """
+        max_workers = min(max_workers or self.max_workers, len(message_ids))
+        print(
+            f"Fetching details for {len(message_ids)} messages with {max_workers} workers..."
+        )
+
+        def fetch(message_id):
+            return self.get_message_details(
+                message_id, http=self._thread_http(), options=options
+            )
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(propagate_context(fetch), message_ids))
+
+    def fetch_message_details(self, message_ids, options=None):
+        """
+        Fetch details for several messages using the configured fetch mode.
+
+        :param options: messages.get options, FULL_MESSAGE_OPTIONS by default
+        """
+        if not message_ids:
+            return []
+        stage = "metadata_fetch" if options is self.METADATA_OPTIONS else "detail_fetch"
+        with time_stage(stage):
+            if self.fetch_mode == "batch":
+                return self.get_message_details_batch(message_ids, options=options)
+            if self.fetch_mode == "parallel":
+                return self.get_message_details_parallel(message_ids, options=options)
+            return [
+                self.get_message_details(message_id, options=options)
+                for message_id in message_ids
+            ]
+
+    def select_relevant_ids(self, message_ids, filter_criteria):
+        """
+        Fetch only the From/Subject headers of the given messages and return the
+        IDs that match filter_criteria, so full bodies are only downloaded for
+        Classroom mail.
+        """
+        if not filter_criteria:
+            return list(message_ids)
+        metadata = self.fetch_message_details(message_ids, options=self.METADATA_OPTIONS)
+        return [
+            details["id"]
+            for details in metadata
+            if details and self.filter_message(details, filter_criteria)
+        ]
+
+    def get_messages_to_fetch(self, after_date=None, incremental=True):
+        """
+        Decide which message stubs this run has to look at.
+
+        When no explicit date is given and a historyId from a previous sync is
+        stored, only the messages added since then are returned. Otherwise a full
+        search is run and the current historyId is captured first so the next
+        run can continue incrementally from here.
+
+        :return: A (pages, history_id) tuple, where pages is an iterable of lists
+                 of message stubs that may still be arriving
+        """
+        self.last_sync_incremental = False
+        start_history_id = self.sync_state.get("history_id")
+        if incremental and after_date is None and start_history_id:
+            changes = self.get_history_message_ids(start_history_id)
+            if changes is not None:
+                message_ids, history_id = changes
+                self.last_sync_incremental = True
+                return [[{"id": message_id} for message_id in message_ids]], history_id
+
+        # Capture the history ID before listing so nothing that arrives in
+        # between is missed by the next incremental run
+        history_id = self.get_history_id()
+        print("Fetching all classroom assignment messages...")
+        return self.prefetch_message_pages(after_date), history_id
+
     def decode_body(self, body):
-        return base64.urlsafe_b64decode(body).decode("utf-8")
+        return decode_body(body)
 
-    def process_payload(self, payload):
-        headers = {
-            header["name"].lower(): header["value"]
-            for header in payload.get("headers", [])
-        }
-        body = self.decode_body(payload.get("body", {}).get("data", ""))
+    def process_payload(self, payload, body_mime_types=None):
+        """
+        Convert a raw Gmail payload into the stored representation.
+
+        Bodies are only decoded for the MIME types in body_mime_types (text/html
+        by default); other parts keep their headers, type and size but no body.
+        """
+        part = payload if isinstance(payload, LazyPart) else LazyPart(payload)
+        body_mime_types = body_mime_types or self.BODY_MIME_TYPES
 
         processed_payload = {
-            "headers": headers,
-            "body": body,
-            "mimeType": payload.get("mimeType", ""),
-            "filename": payload.get("filename", ""),
-            "parts": [self.process_payload(part) for part in payload.get("parts", [])],
+            "headers": part.headers,
+            "body": part.body if part.mime_type.lower() in body_mime_types else "",
+            "mimeType": part.mime_type,
+            "filename": part.filename,
+            "parts": [
+                self.process_payload(child, body_mime_types) for child in part.parts
+            ],
         }
+        if part.size and not processed_payload["body"]:
+            processed_payload["size"] = part.size
         return processed_payload
 
     def filter_messages(self, messages):
@@ -174,26 +586,81 @@ class ClassroomDataManager:
 
     #     return filtered_messages
 
-    def process_messages(self, after_date=None, filter_criteria=None):
-        messages = self.get_messages(after_date)
-        print(f"Total messages fetched: {len(messages)}")
+    def build_message_record(self, details):
+        return {
+            "id": details["id"],
+            "threadId": details["threadId"],
+            "labelIds": details.get("labelIds", []),
+            "snippet": details.get("snippet", ""),
+            "payload": self.process_payload(details.get("payload", {})),
+        }
+
+    def process_messages(
+        self,
+        after_date=None,
+        filter_criteria=None,
+        incremental=True,
+        known_messages=None,
+    ):
+        """
+        Fetch and process the messages for this run.
+
+        :param known_messages: Already processed message records (e.g. the email cache);
+                               these are reused instead of downloading them again
+        :return: The processed message records, in listing order
+        """
+        self.fetch_errors = 0
+        known = {message["id"]: message for message in known_messages or []}
+        pages, history_id = self.get_messages_to_fetch(after_date, incremental)
 
         processed_messages = []
-        for message in messages:
-            details = self.get_message_details(message["id"])
-            if details:
-                message = {
-                    "id": details["id"],
-                    "threadId": details["threadId"],
-                    "labelIds": details.get("labelIds", []),
-                    "snippet": details.get("snippet", ""),
-                    "payload": self.process_payload(details.get("payload", {})),
-                }
-                processed_messages.append(message)
-            else:
-                print(f"Could not fetch details for message ID: {message['id']}")
+        total = 0
+        reused = 0
+        try:
+            # Details for one page are fetched while the next page is listed
+            for messages in pages:
+                total += len(messages)
+                to_fetch = [
+                    message["id"] for message in messages if message["id"] not in known
+                ]
+                if self.last_sync_incremental:
+                    # The History API reports every new mail, not just search
+                    # hits, so check the headers before downloading bodies
+                    to_fetch = self.select_relevant_ids(to_fetch, filter_criteria)
+                details_by_id = dict(
+                    zip(to_fetch, self.fetch_message_details(to_fetch))
+                )
 
+                for message in messages:
+                    cached = known.get(message["id"])
+                    if cached is not None:
+                        processed_messages.append(cached)
+                        reused += 1
+                        continue
+
+                    if message["id"] not in details_by_id:
+                        continue  # Not Classroom mail
+                    details = details_by_id[message["id"]]
+                    if details:
+                        processed_messages.append(self.build_message_record(details))
+                    else:
+                        print(
+                            f"Could not fetch details for message ID: {message['id']}"
+                        )
+        except HttpError as error:
+            print(f"An error occurred while fetching messages: {error}")
+            self.record_fetch_error()
+
+        print(f"Total messages fetched: {total}")
+        if reused:
+            print(f"Reused {reused} messages from the local email cache.")
         print(f"Total processed messages: {len(processed_messages)}")
+        self.report_fetch_counts(total, reused, len(processed_messages))
+
+        # Only advance the history pointer when nothing was missed, so failed
+        # messages are picked up again by the next run
+        if history_id and self.fetch_errors == 0:
+            self.sync_state.set("history_id", history_id)
 
         return processed_messages
 
@@ -203,86 +670,22 @@ class ClassroomDataManager:
             return None
 
     def extract_assignment_info(self, messages):
-        extracted_data = []
-        for data in messages:
-            # Extract the HTML content
-            html_content = data["payload"]["parts"][1]["body"]
-
-            # Extract assignment name
-            assignment_name_match = re.search(r"<div>(.*?)</div>", html_content)
-            assignment_name = (
-                assignment_name_match.group(1) if assignment_name_match else "Not found"
-            )
-
-            # Extract class link
-
-            link_pattern = r"https://accounts\.google\.com/AccountChooser\?continue="
-            link_match = re.search(
-                r"href=(https://accounts\.google\.com/AccountChooser\?continue=https://classroom\.google\.com/c/[^&]+)",
-                html_content,
-            )
-            class_link = link_match.group(1) if link_match else "Not found"
-            class_link = re.sub(link_pattern, "", class_link)
-
-            assignment_match = re.search(
-                r"href=(https://accounts\.google\.com/AccountChooser\?continue=https://classroom\.google\.com/c/[^&]+/a/[^&]+)",
-                html_content,
-            )
-            assignment_link = (
-                assignment_match.group(1) if assignment_match else "Not found"
-            )
-            assignment_link = re.sub(link_pattern, "", assignment_link)
-
-            # Extract assignment description
-            description_match = re.search(r"<ul>(.*?)</ul>", html_content, re.DOTALL)
-            if description_match:
-                description_items = re.findall(
-                    r"<li>(.*?)</li>", description_match.group(1)
-                )
-                assignment_description = "\n".join(description_items)
-            else:
-                assignment_description = "Not found"
-
-            # Extract class name
-            class_match = re.search(
-                r">([^<]+)</td></tr></table></a></td>", html_content
-            )
-            class_name = class_match.group(1) if class_match else "Not found"
-
-            # Extract due date
-            due_date_match = re.search(r"Due ([^<]+)", html_content)
-            due_date = due_date_match.group(1) if due_date_match else "Not found"
-
-            # Extract posted date and author
-            posted_info_match = re.search(r"Posted on ([^<]+) by ([^<]+)", html_content)
-            if posted_info_match:
-                posted_date = posted_info_match.group(1)
-                posted_by = posted_info_match.group(2)
-            else:
-                posted_date = "Not found"
-                posted_by = "Not found"
-
-            extracted_data.append(
-                {
-                    "assignment_name": assignment_name,
-                    "assignment_link": assignment_link,
-                    "class_link": class_link,
-                    "assignment_description": assignment_description,
-                    "class_name": class_name,
-                    "due_date": due_date,
-                    "posted_date": posted_date,
-                    "posted_by": posted_by,
-                }
-            )
-        return extracted_data
+        return extract_assignments(messages)
 
     def run(
-        self, after_date=None, output_file="classroom_data.json", filter_criteria=None
+        self,
+        after_date=None,
+        output_file="classroom_data.json",
+        filter_criteria=None,
+        incremental=True,
+        known_messages=None,
     ):
         print("Starting ClassroomDataManager...")
         self.authenticate()
-        self.service = build("gmail", "v1", credentials=self.creds)
-        processed_messages = self.process_messages(after_date, filter_criteria)
+        self.service = get_gmail_service(self.creds)
+        processed_messages = self.process_messages(
+            after_date, filter_criteria, incremental, known_messages
+        )
         # print(processed_messages)
         if processed_messages:
             # self.save_to_json(processed_messages, output_file)
@@ -0,0 +1,205 @@
+import re
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Optional, Tuple
+
+MONTHS = {
+    "jan": 1,
+    "feb": 2,
+    "mar": 3,
+    "apr": 4,
+    "may": 5,
+    "jun": 6,
+    "jul": 7,
+    "aug": 8,
+    "sep": 9,
+    "sept": 9,
+    "oct": 10,
+    "nov": 11,
+    "dec": 12,
+    "january": 1,
+    "february": 2,
+    "march": 3,
+    "april": 4,
+    "june": 6,
+    "july": 7,
+    "august": 8,
+    "september": 9,
+    "october": 10,
+    "november": 11,
+    "december": 12,
+}
+
+TIMEZONE_SUFFIX_RE = re.compile(r"\s*\([^)]+\)")
+# The shapes Classroom uses, checked by pattern rather than by trial strptime calls
+TIME_MONTH_DAY_RE = re.compile(
+    r"(\d{1,2}):(\d{2})\s+([AP]M),\s+([A-Za-z]{3})\s+(\d{1,2})", re.IGNORECASE
+)  # "8:43 AM, Jun 13"
+MONTH_DAY_RE = re.compile(r"([A-Za-z]+)\s+(\d{1,2})")  # "Jun 13", "June 13"
+MONTH_DAY_YEAR_RE = re.compile(r"([A-Za-z]+)\s+(\d{1,2}),?\s+(\d{4})")  # "Jun 13, 2025"
+US_DATE_RE = re.compile(r"(\d{1,2})/(\d{1,2})/(\d{4})")  # "06/13/2025"
+ISO_DATE_RE = re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2})")  # "2025-06-13"
+# Last resort: a month name followed by a day anywhere in the string
+LOOSE_MONTH_DAY_RE = re.compile(r"(\w+)\s+(\d+)(?:,?\s+(\d{4})\b)?")
+
+# How far before the reference a "forward" date may fall and keep its year
+FORWARD_SLACK_DAYS = 7
+
+# (year or None, month, day, hour, minute)
+DateParts = Tuple[Optional[int], int, int, int, int]
+
+
+def _month_number(name, full_names=True):
+    month = MONTHS.get(name.lower())
+    if month is None or (not full_names and len(name) != 3):
+        return None
+    return month
+
+
+def _valid(year, month, day):
+    try:
+        # 2000 is a leap year, so Feb 29 without a year is accepted here
+        datetime(year or 2000, month, day)
+        return True
+    except ValueError:
+        return False
+
+
+@lru_cache(maxsize=4096)
+def parse_date_parts(date_str: str) -> Optional[DateParts]:
+    """
+    Detect the shape of a Classroom date string and split it into its parts.
+
+    Cached on the raw string because the same "Oct 20" style strings repeat
+    across many emails. The year is None when the string doesn't contain one.
+    """
+    cleaned = TIMEZONE_SUFFIX_RE.sub("", date_str).strip()
+
+    match = TIME_MONTH_DAY_RE.fullmatch(cleaned)
+    if match:
+        hour, minute = int(match.group(1)), int(match.group(2))
+        month = _month_number(match.group(4), full_names=False)
+        day = int(match.group(5))
+        if month and 1 <= hour <= 12 and minute < 60 and _valid(None, month, day):
+            hour = hour % 12 + (12 if match.group(3).upper() == "PM" else 0)
+            return None, month, day, hour, minute
+
+    match = MONTH_DAY_RE.fullmatch(cleaned)
+    if match:
+        month = _month_number(match.group(1))
+        day = int(match.group(2))
+        if month and _valid(None, month, day):
+            return None, month, day, 0, 0
+
+    match = MONTH_DAY_YEAR_RE.fullmatch(cleaned)
+    if match:
+        month = _month_number(match.group(1))
+        day, year = int(match.group(2)), int(match.group(3))
+        if month and _valid(year, month, day):
+            return year, month, day, 0, 0
+
+    match = US_DATE_RE.fullmatch(cleaned)
+    if match:
+        month, day, year = (int(group) for group in match.groups())
+        if _valid(year, month, day):
+            return year, month, day, 0, 0
+
+    match = ISO_DATE_RE.fullmatch(cleaned)
+    if match:
+        year, month, day = (int(group) for group in match.groups())
+        if _valid(year, month, day):
+            return year, month, day, 0, 0
+
+    match = LOOSE_MONTH_DAY_RE.search(cleaned)
+    if match:
+        month = _month_number(match.group(1))
+        day = int(match.group(2))
+        year = int(match.group(3)) if match.group(3) else None
+        if month and _valid(year, month, day):
+            return year, month, day, 0, 0
+
+    return None
+
+
+def infer_year(
+    month: int, day: int, reference: datetime, direction: str = "nearest"
+) -> Optional[int]:
+    """
+    Pick the year for a month/day that came without one.
+
+    Emails only say "Dec 30" or "Jan 5", so the year has to come from when the
+    email was received:
+
+    - "nearest": the year that puts the date closest to the reference
+    - "forward": the first occurrence on or after the reference, allowing
+      FORWARD_SLACK_DAYS before it (due dates; a teacher may post an
+      assignment that is already due)
+    - "backward": the last occurrence on or before the reference (posted dates)
+
+    Returns None when the date doesn't exist in any candidate year.
+    """
+    reference_day = datetime(reference.year, reference.month, reference.day)
+    if direction == "forward":
+        earliest = reference_day - timedelta(days=FORWARD_SLACK_DAYS)
+        # Feb 29 can be up to four years away
+        for year in range(reference.year - 1, reference.year + 5):
+            candidate = _candidate(year, month, day)
+            if candidate is not None and candidate >= earliest:
+                return year
+        return None
+    if direction == "backward":
+        for year in range(reference.year, reference.year - 5, -1):
+            candidate = _candidate(year, month, day)
+            if candidate is not None and candidate <= reference_day:
+                return year
+        return None
+
+    best_year = None
+    best_distance = None
+    for year in (reference.year - 1, reference.year, reference.year + 1):
+        candidate = _candidate(year, month, day)
+        if candidate is None:
+            continue
+        distance = abs((candidate - reference).total_seconds())
+        if best_distance is None or distance < best_distance:
+            best_year, best_distance = year, distance
+    return best_year
+
+
+def _candidate(year, month, day):
+    try:
+        return datetime(year, month, day)
+    except ValueError:
+        return None  # Feb 29 in a non-leap year
+
+
+def parse_date(
+    date_str: str, reference: Optional[datetime] = None, direction: str = "nearest"
+) -> Optional[datetime]:
+    """
+    Parse a date string from a Classroom email.
+
+    :param date_str: e.g. "Oct 20", "8:43 AM, Jun 13 (EDT)" or "06/13/2025"
+    :param reference: When the email was received; used to infer a missing
+                      year. Defaults to now.
+    :param direction: How a missing year is inferred relative to reference
+                      ("nearest", "forward" or "backward", see infer_year())
+    :return: A naive datetime, or None if the string can't be parsed
+    """
+    if not date_str or date_str == "Not found":
+        return None
+
+    parts = parse_date_parts(date_str)
+    if parts is None:
+        print(f"Unable to parse date: {date_str}")
+        return None
+
+    year, month, day, hour, minute = parts
+    if year is None:
+        reference = (reference or datetime.now()).replace(tzinfo=None)
+        year = infer_year(month, day, reference, direction)
+    try:
+        return datetime(year, month, day, hour, minute)
+    except (TypeError, ValueError):
+        print(f"Unable to parse date: {date_str}")
+        return None
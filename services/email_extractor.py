@@ -0,0 +1,124 @@
+import re
+import logging
+from email.utils import parsedate_to_datetime
+from services.parallel import map_chunks
+
+# Bump when the extracted fields change so cached extraction results are redone
+EXTRACTOR_VERSION = 3
+
+NOT_FOUND = "Not found"
+ACCOUNT_CHOOSER_PREFIX = "https://accounts.google.com/AccountChooser?continue="
+
+# Compiled once at import instead of on every message
+ASSIGNMENT_NAME_RE = re.compile(r"<div>(.*?)</div>")
+CLASS_LINK_RE = re.compile(
+    r"href=(https://accounts\.google\.com/AccountChooser\?continue=https://classroom\.google\.com/c/[^&]+)"
+)
+ASSIGNMENT_LINK_RE = re.compile(
+    r"href=(https://accounts\.google\.com/AccountChooser\?continue=https://classroom\.google\.com/c/[^&]+/a/[^&]+)"
+)
+DESCRIPTION_RE = re.compile(r"<ul>(.*?)</ul>", re.DOTALL)
+DESCRIPTION_ITEM_RE = re.compile(r"<li>(.*?)</li>")
+CLASS_NAME_RE = re.compile(r">([^<]+)</td></tr></table></a></td>")
+DUE_DATE_RE = re.compile(r"Due ([^<]+)")
+POSTED_INFO_RE = re.compile(r"Posted on ([^<]+) by ([^<]+)")
+
+
+def find_part(payload, mime_type="text/html"):
+    """Depth-first search of a processed payload for the first part with mime_type."""
+    if payload.get("mimeType", "").lower() == mime_type:
+        return payload
+    for part in payload.get("parts", []):
+        found = find_part(part, mime_type)
+        if found is not None:
+            return found
+    return None
+
+
+def find_html_body(message):
+    part = find_part(message.get("payload", {}))
+    if part is None:
+        return None
+    return part.get("body") or None
+
+
+def _strip_account_chooser(link):
+    return link.replace(ACCOUNT_CHOOSER_PREFIX, "")
+
+
+def _group(pattern, html_content):
+    match = pattern.search(html_content)
+    return match.group(1) if match else NOT_FOUND
+
+
+def extract_fields(html_content):
+    """Pull every assignment field out of a Classroom notification's HTML body."""
+    description_match = DESCRIPTION_RE.search(html_content)
+    if description_match:
+        assignment_description = "\n".join(
+            DESCRIPTION_ITEM_RE.findall(description_match.group(1))
+        )
+    else:
+        assignment_description = NOT_FOUND
+
+    posted_info_match = POSTED_INFO_RE.search(html_content)
+    if posted_info_match:
+        posted_date, posted_by = posted_info_match.group(1, 2)
+    else:
+        posted_date = posted_by = NOT_FOUND
+
+    return {
+        "assignment_name": _group(ASSIGNMENT_NAME_RE, html_content),
+        "assignment_link": _strip_account_chooser(
+            _group(ASSIGNMENT_LINK_RE, html_content)
+        ),
+        "class_link": _strip_account_chooser(_group(CLASS_LINK_RE, html_content)),
+        "assignment_description": assignment_description,
+        "class_name": _group(CLASS_NAME_RE, html_content),
+        "due_date": _group(DUE_DATE_RE, html_content),
+        "posted_date": posted_date,
+        "posted_by": posted_by,
+    }
+
+
+def received_date(message):
+    """The message's Date header as an ISO 8601 string, or None."""
+    date_header = message.get("payload", {}).get("headers", {}).get("date")
+    if not date_header:
+        return None
+    try:
+        return parsedate_to_datetime(date_header).isoformat()
+    except (TypeError, ValueError):
+        return None
+
+
+def extract_assignment(message):
+    """
+    Extract the assignment fields from one processed message.
+
+    :return: The extracted fields, or None when the message has no HTML part
+    """
+    html_content = find_html_body(message)
+    if html_content is None:
+        logging.warning(
+            f"Message {message.get('id')} has no text/html part, skipping it"
+        )
+        return None
+    fields = extract_fields(html_content)
+    fields["received_date"] = received_date(message)
+    fields["message_id"] = message.get("id")
+    return fields
+
+
+def extract_assignments(messages):
+    # Large backfills are sharded across processes when PARALLEL_PARSE is on
+    return map_chunks(extract_assignments_serial, messages)
+
+
+def extract_assignments_serial(messages):
+    extracted_data = []
+    for message in messages:
+        fields = extract_assignment(message)
+        if fields is not None:
+            extracted_data.append(fields)
+    return extracted_data
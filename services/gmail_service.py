@@ -0,0 +1,75 @@
+import json
+import logging
+import threading
+import time
+
+from googleapiclient.discovery import build, build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+from services.metrics import observe_stage
+
+_service = None
+_service_creds = None
+_document = None
+_document_loaded = False
+_lock = threading.Lock()
+_stats = {
+    "discovery_source": None,
+    "discovery_load_seconds": None,
+    "builds": 0,
+    "reuses": 0,
+    "last_build_seconds": None,
+    "total_build_seconds": 0.0,
+}
+
+
+def _load_document():
+    """Load the Gmail discovery document bundled with google-api-python-client."""
+    global _document, _document_loaded
+    start = time.perf_counter()
+    document = get_static_doc("gmail", "v1")
+    _document = json.loads(document) if document else None
+    _document_loaded = True
+    _stats["discovery_source"] = "static" if _document else "network"
+    _stats["discovery_load_seconds"] = round(time.perf_counter() - start, 4)
+    if _document is None:
+        logging.warning("No bundled Gmail discovery document, fetching it on every build")
+
+
+def get_gmail_service(creds):
+    """
+    Return a process-wide Gmail service for creds.
+
+    The discovery document is parsed once per process, and the service is
+    reused across syncs as long as the same credentials object is passed. A
+    new credentials object (e.g. after re-authentication) builds a new service
+    from the already parsed document.
+    """
+    global _service, _service_creds
+    with _lock:
+        if _service is not None and _service_creds is creds:
+            _stats["reuses"] += 1
+            return _service
+
+        if not _document_loaded:
+            _load_document()
+
+        start = time.perf_counter()
+        if _document is not None:
+            service = build_from_document(_document, credentials=creds)
+        else:
+            service = build("gmail", "v1", credentials=creds, static_discovery=False)
+        elapsed = time.perf_counter() - start
+        observe_stage("discovery_build", elapsed)
+
+        _service, _service_creds = service, creds
+        _stats["builds"] += 1
+        _stats["last_build_seconds"] = round(elapsed, 4)
+        _stats["total_build_seconds"] = round(_stats["total_build_seconds"] + elapsed, 4)
+        logging.info(f"Built Gmail service in {elapsed * 1000:.1f} ms")
+        return service
+
+
+def service_stats():
+    """Discovery/build timings and how often the cached service was reused."""
+    with _lock:
+        return dict(_stats)
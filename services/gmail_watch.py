@@ -0,0 +1,138 @@
+import base64
+import json
+import logging
+import os
+import threading
+import time
+
+from services.gmail_service import get_gmail_service
+from services.google_auth import get_credential_provider
+from services.sync_state import SyncState
+
+# Gmail ends a watch after 7 days; renew it once less than a day is left
+RENEW_BEFORE_SECONDS = 24 * 60 * 60
+
+
+def decode_push(envelope):
+    """
+    Decode a Pub/Sub push request body sent for a Gmail watch.
+
+    :param envelope: {"message": {"data": base64 JSON, ...}, "subscription": ...}
+    :return: An (email_address, history_id) tuple, or None if it isn't a Gmail push
+    """
+    try:
+        data = base64.b64decode(envelope["message"]["data"])
+        payload = json.loads(data.decode("utf-8"))
+        return payload.get("emailAddress"), int(payload["historyId"])
+    except (KeyError, TypeError, ValueError) as e:
+        logging.warning(f"Ignoring malformed Gmail push notification: {str(e)}")
+        return None
+
+
+class GmailWatch:
+    """
+    Keeps a Gmail users.watch registered and decides which pushes need a sync.
+
+    Gmail publishes to the Pub/Sub topic GMAIL_PUBSUB_TOPIC whenever the
+    mailbox history changes. A push only starts a sync when its historyId is
+    newer than what the last sync (or an earlier push) already covered. The
+    watch bookkeeping lives in its own state file so it never races with the
+    history_id written by the sync itself.
+    """
+
+    def __init__(
+        self,
+        topic_name=None,
+        label_ids=None,
+        state_file="cache/gmail_watch.json",
+        sync_state_file="cache/gmail_state.json",
+        credentials_file="credentials.json",
+        token_file="token.json",
+    ):
+        self.topic_name = topic_name or os.getenv("GMAIL_PUBSUB_TOPIC")
+        self.label_ids = label_ids or ["INBOX"]
+        self.state = SyncState(state_file)
+        self.sync_state_file = sync_state_file
+        self.credentials_file = credentials_file
+        self.token_file = token_file
+        self.pushes_received = 0
+        self.pushes_ignored = 0
+        self.syncs_triggered = 0
+        self.last_push = None
+        self._last_history_id = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return bool(self.topic_name)
+
+    def _service(self):
+        provider = get_credential_provider(self.credentials_file, self.token_file)
+        return get_gmail_service(provider.get_credentials())
+
+    def start(self):
+        """Register (or re-register) the watch on the mailbox."""
+        response = (
+            self._service()
+            .users()
+            .watch(
+                userId="me",
+                body={
+                    "topicName": self.topic_name,
+                    "labelIds": self.label_ids,
+                    "labelFilterBehavior": "INCLUDE",
+                },
+            )
+            .execute()
+        )
+        expiration = int(response["expiration"]) / 1000
+        self.state.set("expiration", expiration)
+        self.state.set("history_id", response.get("historyId"))
+        logging.info(
+            f"Gmail watch on {self.topic_name} registered until {time.ctime(expiration)}"
+        )
+        return response
+
+    def needs_renewal(self):
+        expiration = self.state.get("expiration")
+        return not expiration or expiration - time.time() < RENEW_BEFORE_SECONDS
+
+    def ensure(self):
+        """Register the watch if it is missing or about to expire."""
+        if self.needs_renewal():
+            self.start()
+
+    def stop(self):
+        self._service().users().stop(userId="me").execute()
+        self.state.clear("expiration")
+
+    def should_sync(self, history_id):
+        """
+        Record a push and decide whether it reports unsynced changes.
+
+        Pub/Sub delivers at least once and Gmail may send several pushes for one
+        burst of mail, so older or repeated historyIds are ignored.
+        """
+        synced_history_id = SyncState(self.sync_state_file).get("history_id")
+        with self._lock:
+            self.pushes_received += 1
+            self.last_push = {"history_id": history_id, "received_at": time.time()}
+            covered = max(int(synced_history_id or 0), self._last_history_id)
+            if history_id <= covered:
+                self.pushes_ignored += 1
+                return False
+            self._last_history_id = history_id
+            self.syncs_triggered += 1
+            return True
+
+    def status(self):
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "topic": self.topic_name,
+                "expiration": self.state.get("expiration"),
+                "pushes_received": self.pushes_received,
+                "pushes_ignored": self.pushes_ignored,
+                "syncs_triggered": self.syncs_triggered,
+                "last_push": self.last_push,
+            }
@@ -1,5 +1,9 @@
+import json
 import os
 import os.path
+import logging
+import tempfile
+import threading
 from datetime import datetime, timezone, timedelta
 
 from google.auth.transport.requests import Request
@@ -8,6 +12,7 @@ from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from dotenv import load_dotenv
+from services.utils import env_number
 
 # If modifying these scopes, delete the file token.json.
 
@@ -83,4 +88,168 @@ class Authenticator:
                     token.write(creds.to_json())
             except Exception:
                 pass
-        return creds
\ No newline at end of file
+        return creds
+
+
+# With TOKEN_EARLY_REFRESH_MINUTES unset the background refresh still runs this
+# long before expiry, ahead of google-auth treating the token as expired
+DEFAULT_REFRESH_MARGIN_MINUTES = 5
+# Delay before retrying a failed background refresh
+REFRESH_RETRY_SECONDS = 60
+# Lower bound between background refreshes, whatever the margin and token lifetime
+MIN_REFRESH_DELAY_SECONDS = 30
+
+
+def _expiry_utc(creds):
+    expiry = creds.expiry
+    if expiry is not None and expiry.tzinfo is None:
+        expiry = expiry.replace(tzinfo=timezone.utc)
+    return expiry
+
+
+class CredentialProvider:
+    """
+    Keeps Google credentials in memory and refreshes them in the background.
+
+    The first call loads them through the Authenticator (token.json, re-auth
+    rules and all). After that they are handed out from memory and a timer
+    refreshes them TOKEN_EARLY_REFRESH_MINUTES before they expire, so a sync
+    never waits on disk I/O or a token refresh. The refreshed credentials
+    replace the old object, which callers keep using until then. token.json
+    is rewritten only when the refresh actually produced a new token.
+    """
+
+    def __init__(self, credentials_file="credentials.json", token_file="token.json"):
+        self.authenticator = Authenticator(credentials_file, token_file)
+        self.token_file = token_file
+        self.creds = None
+        self.refreshes = 0
+        self.last_refresh = None
+        self._saved_token = None
+        self._timer = None
+        self._closed = False
+        self._lock = threading.RLock()
+        load_dotenv()
+        self.early_refresh_minutes = env_number("TOKEN_EARLY_REFRESH_MINUTES", 0)
+
+    def get_credentials(self):
+        with self._lock:
+            if self.creds is None or not self.creds.valid:
+                if self.creds is not None and self.creds.refresh_token:
+                    # The background refresh didn't run in time, do it inline
+                    fresh = self._refreshed(self.creds)
+                    if fresh is not None:
+                        self._install(fresh)
+                if self.creds is None or not self.creds.valid:
+                    self.creds = self.authenticator.get_credentials()
+                    self._saved_token = self.creds.token
+                self._schedule_refresh()
+            return self.creds
+
+    def _refreshed(self, creds):
+        """
+        Refresh a copy of creds and return it, or None if the refresh failed.
+
+        Works on a copy so the network call can run without holding the lock
+        while other threads keep using the current credentials.
+        """
+        fresh = Credentials.from_authorized_user_info(json.loads(creds.to_json()))
+        try:
+            fresh.refresh(Request())
+        except Exception as e:
+            logging.warning(f"Could not refresh Google credentials: {str(e)}")
+            return None
+        return fresh
+
+    def _install(self, fresh):
+        self.creds = fresh
+        self.refreshes += 1
+        self.last_refresh = datetime.now(timezone.utc).isoformat()
+        self._save_token()
+
+    def _save_token(self):
+        if self.creds.token == self._saved_token:
+            return
+        directory = os.path.dirname(os.path.abspath(self.token_file))
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w") as token:
+                token.write(self.creds.to_json())
+            os.replace(tmp_path, self.token_file)
+            self._saved_token = self.creds.token
+        except Exception as e:
+            logging.warning(f"Could not write {self.token_file}: {str(e)}")
+
+    def _schedule_refresh(self, delay=None):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._closed or self.creds is None or not self.creds.refresh_token:
+            return
+        if delay is None:
+            expiry = _expiry_utc(self.creds)
+            if expiry is None:
+                return
+            margin = 60 * (self.early_refresh_minutes or DEFAULT_REFRESH_MARGIN_MINUTES)
+            remaining = (expiry - datetime.now(timezone.utc)).total_seconds()
+            # A margin as long as the token lifetime would refresh right after
+            # every refresh; wait at least half the remaining lifetime instead
+            delay = max(remaining - margin, remaining / 2, MIN_REFRESH_DELAY_SECONDS)
+        self._timer = threading.Timer(delay, self._background_refresh)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _background_refresh(self):
+        with self._lock:
+            if self._closed or self.creds is None:
+                return
+            creds = self.creds
+        fresh = self._refreshed(creds)
+        with self._lock:
+            if self._closed:
+                return
+            if fresh is None:
+                self._schedule_refresh(REFRESH_RETRY_SECONDS)
+                return
+            # get_credentials() may have replaced them while we were refreshing
+            if self.creds is creds:
+                self._install(fresh)
+            self._schedule_refresh()
+
+    def status(self):
+        with self._lock:
+            expiry = _expiry_utc(self.creds) if self.creds is not None else None
+            return {
+                "loaded": self.creds is not None,
+                "expiry": expiry.isoformat() if expiry else None,
+                "refreshes": self.refreshes,
+                "last_refresh": self.last_refresh,
+            }
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_credential_provider(credentials_file="credentials.json", token_file="token.json"):
+    """Return the process-wide CredentialProvider, creating it on first use."""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = CredentialProvider(credentials_file, token_file)
+        return _provider
+
+
+def close_credential_provider():
+    global _provider
+    with _provider_lock:
+        if _provider is not None:
+            _provider.close()
+            _provider = None
@@ -0,0 +1,97 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from services.utils import utc_now
+
+
+class JobRunner:
+    """
+    Owns the server's long-running background loops (scheduled syncs, Gmail
+    watch renewal).
+
+    Jobs run as tasks on the server's own event loop, started from the FastAPI
+    lifespan, so nothing depends on the server being reachable over HTTP.
+    stop() cancels them and waits for them to unwind. Each call of a function
+    wrapped with tracked() is recorded, so the last run's time, duration and
+    outcome can be reported.
+    """
+
+    def __init__(self):
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+
+    def start(self, name: str, loop: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        """Start the coroutine function loop as the background job name."""
+        job = self.jobs.setdefault(name, {"runs": 0, "last_run": None})
+        job.update(
+            {"task": asyncio.create_task(loop()), "state": "running", "started_at": utc_now()}
+        )
+        job["task"].add_done_callback(lambda task: self._on_exit(name, task))
+        return job["task"]
+
+    def _on_exit(self, name, task: asyncio.Task):
+        job = self.jobs[name]
+        if task.cancelled():
+            job["state"] = "stopped"
+        elif task.exception() is not None:
+            # Make a loop that died visible instead of silently dropping it
+            job["state"] = "crashed"
+            job["error"] = str(task.exception())
+            logging.error(
+                f"Background job {name} crashed: {task.exception()}",
+                exc_info=task.exception(),
+            )
+        else:
+            job["state"] = "finished"
+
+    def tracked(self, name: str, func: Callable[..., Awaitable[Any]]):
+        """Wrap an async function so every call is recorded as a run of job name."""
+        job = self.jobs.setdefault(name, {"runs": 0, "last_run": None, "state": "idle"})
+
+        async def run(*args, **kwargs):
+            started_at = utc_now()
+            started = time.monotonic()
+            outcome = "error"
+            result = None
+            try:
+                result = await func(*args, **kwargs)
+                failed = isinstance(result, dict) and result.get("error")
+                outcome = "error" if failed else "ok"
+                return result
+            except asyncio.CancelledError:
+                outcome = "cancelled"
+                raise
+            except Exception as e:
+                result = {"error": str(e)}
+                raise
+            finally:
+                job["runs"] += 1
+                job["last_run"] = {
+                    "started_at": started_at,
+                    "finished_at": utc_now(),
+                    "duration_seconds": round(time.monotonic() - started, 3),
+                    "outcome": outcome,
+                    "message": result.get("message") if isinstance(result, dict) else None,
+                    "error": result.get("error") if isinstance(result, dict) else None,
+                }
+
+        return run
+
+    async def stop(self, timeout: Optional[float] = 10):
+        """Cancel every job and wait up to timeout seconds for them to finish."""
+        tasks = [
+            job["task"]
+            for job in self.jobs.values()
+            if job.get("task") is not None and not job["task"].done()
+        ]
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.wait(tasks, timeout=timeout)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            name: {key: value for key, value in job.items() if key != "task"}
+            for name, job in self.jobs.items()
+        }
@@ -0,0 +1,47 @@
+import base64
+
+
+def decode_body(data):
+    return base64.urlsafe_b64decode(data).decode("utf-8")
+
+
+class LazyPart:
+    """
+    A raw Gmail MIME part whose body stays base64-encoded until it is read.
+
+    Only the parts that are actually accessed (normally the text/html
+    alternative) pay for decoding; attachments and the plain-text copy never do.
+    """
+
+    def __init__(self, raw):
+        self.raw = raw
+        self._body = None
+
+    @property
+    def mime_type(self):
+        return self.raw.get("mimeType", "")
+
+    @property
+    def filename(self):
+        return self.raw.get("filename", "")
+
+    @property
+    def headers(self):
+        return {
+            header["name"].lower(): header["value"]
+            for header in self.raw.get("headers", [])
+        }
+
+    @property
+    def parts(self):
+        return [LazyPart(part) for part in self.raw.get("parts", [])]
+
+    @property
+    def size(self):
+        return self.raw.get("body", {}).get("size", 0)
+
+    @property
+    def body(self):
+        if self._body is None:
+            self._body = decode_body(self.raw.get("body", {}).get("data", ""))
+        return self._body
@@ -1,11 +1,73 @@
 # notion_manager.py
 import requests
 import os
-from typing import List, Dict, Any
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from typing import List, Dict, Any, Iterator, Optional
+from services.rate_limiter import TokenBucket, backoff_delay, parse_retry_after
+from services.metrics import count_api_call, count_rate_limited, count_retry
+from services.tracing import propagate_context, span
+from services.utils import env_number
+
+DEFAULT_POOL_SIZE = 10
+# Notion allows an average of three requests per second per integration
+DEFAULT_REQUESTS_PER_SECOND = 3.0
+DEFAULT_MAX_CONCURRENCY = 3
+DEFAULT_MAX_RETRIES = 5
+# The properties NotionCache derives an assignment's identity from
+IDENTITY_PROPERTIES = ["Name", "Course", "Due", "URL"]
+
+
+_shared_session = None
+_shared_session_lock = threading.Lock()
+
+
+def create_session(pool_size: int = DEFAULT_POOL_SIZE) -> requests.Session:
+    """Create a requests.Session that keeps up to pool_size connections alive."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_shared_session(pool_size: Optional[int] = None) -> requests.Session:
+    """
+    Return a process-wide pooled session, creating it on first use.
+
+    Long-running processes (the FastAPI server, scheduler.py) reuse the same
+    keep-alive connections to api.notion.com across syncs.
+    """
+    global _shared_session
+    with _shared_session_lock:
+        if _shared_session is None:
+            _shared_session = create_session(
+                pool_size or env_number("NOTION_POOL_SIZE", DEFAULT_POOL_SIZE)
+            )
+        return _shared_session
+
+
+def close_shared_session():
+    global _shared_session
+    with _shared_session_lock:
+        if _shared_session is not None:
+            _shared_session.close()
+            _shared_session = None
 
 
 class NotionDatabaseManager:
-    def __init__(self, database_id: str, token: str = None):
+    def __init__(
+        self,
+        database_id: str,
+        token: str = None,
+        session: Optional[requests.Session] = None,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        rate_limiter: Optional[TokenBucket] = None,
+        max_concurrency: Optional[int] = None,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+    ):
         self.database_id = database_id
         self.token = token or os.environ.get("NOTION_TOKEN")
         self.base_url = "https://api.notion.com/v1"
@@ -14,11 +76,33 @@ class NotionDatabaseManager:
             "Notion-Version": "2022-06-28",
             "Content-Type": "application/json",
         }
+        # Only close the session on close() if this manager created it
+        self._owns_session = session is None
+        self.session = session or create_session(pool_size)
+        self.rate_limiter = rate_limiter or TokenBucket(
+            env_number("NOTION_RATE_LIMIT", DEFAULT_REQUESTS_PER_SECOND, float)
+        )
+        self.max_concurrency = max(
+            1,
+            max_concurrency
+            or env_number("NOTION_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY),
+        )
+        self.max_retries = max_retries
+
+    def close(self):
+        if self._owns_session:
+            self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
     def query_database(self, filter_conditions: List[Dict[str, Any]]) -> Dict[str, Any]:
         url = f"{self.base_url}/databases/{self.database_id}/query"
         data = {"filter": {"or": filter_conditions}}
-        response = requests.post(url, json=data, headers=self.headers)
+        response = self.session.post(url, json=data, headers=self.headers)
         return response.json()
 
     def get_tasks_by_status(self, statuses: List[str]) -> Dict[str, Any]:
@@ -29,12 +113,12 @@ class NotionDatabaseManager:
 
     def get_database_properties(self) -> Dict[str, Any]:
         url = f"{self.base_url}/databases/{self.database_id}"
-        response = requests.get(url, headers=self.headers)
+        response = self.session.get(url, headers=self.headers)
         return response.json()
 
     def get_database_schema(self) -> Dict[str, Any]:
         url = f"{self.base_url}/databases/{self.database_id}"
-        response = requests.get(url, headers=self.headers)
+        response = self.request("GET", url)
         response.raise_for_status()
         return response.json()
 
@@ -54,10 +138,109 @@ class NotionDatabaseManager:
 
         return rollups
 
-    def post_data(self, data: Dict[str, Any]):
-        url = "https://api.notion.com/v1/pages/"
-        responses = []
-        for item in data:
-            response = requests.post(url, json=item, headers=self.headers)
-            responses.append(response.json())
-        return responses
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Send a request, waiting for the rate limiter before every attempt.
+
+        429 responses pause the shared limiter for the Retry-After period, 5xx
+        responses and connection errors are retried with exponential backoff and
+        jitter. The last response is returned; the last connection error is raised.
+        """
+        for attempt in range(self.max_retries + 1):
+            retries_left = attempt < self.max_retries
+            self.rate_limiter.acquire()
+            if attempt:
+                count_retry("notion")
+            count_api_call("notion", method.lower())
+            try:
+                with span(f"notion.{method.lower()}", url=url, attempt=attempt):
+                    response = self.session.request(
+                        method, url, headers=self.headers, **kwargs
+                    )
+            except requests.RequestException:
+                if retries_left:
+                    time.sleep(backoff_delay(attempt))
+                    continue
+                raise
+
+            if response.status_code == 429:
+                count_rate_limited("notion")
+            if response.status_code == 429 and retries_left:
+                delay = parse_retry_after(response.headers.get("Retry-After"))
+                self.rate_limiter.pause(
+                    delay if delay is not None else backoff_delay(attempt)
+                )
+                continue
+            if response.status_code >= 500 and retries_left:
+                time.sleep(backoff_delay(attempt))
+                continue
+            return response
+
+    def create_page(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """Create a single page. The response (or an error dict) is returned, never raised."""
+        url = f"{self.base_url}/pages/"
+        try:
+            response = self.request("POST", url, json=item)
+        except requests.RequestException as error:
+            return {"object": "error", "status": None, "message": str(error)}
+        try:
+            return response.json()
+        except ValueError:
+            return {
+                "object": "error",
+                "status": response.status_code,
+                "message": response.text,
+            }
+
+    def iter_database_pages(
+        self,
+        filter_conditions: Optional[List[Dict[str, Any]]] = None,
+        filter_properties: Optional[List[str]] = None,
+        page_size: int = 100,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Yield every page in the database, following start_cursor/has_more.
+
+        :param filter_conditions: Optional conditions combined with "or", as in query_database()
+        :param filter_properties: Property IDs to return; other properties are left out
+        :param page_size: Pages per request (Notion allows up to 100)
+        """
+        url = f"{self.base_url}/databases/{self.database_id}/query"
+        params = [("filter_properties", prop) for prop in filter_properties or []]
+        data = {"page_size": page_size}
+        if filter_conditions:
+            data["filter"] = {"or": filter_conditions}
+        while True:
+            response = self.request("POST", url, params=params, json=data)
+            response.raise_for_status()
+            results = response.json()
+            yield from results.get("results", [])
+            if not results.get("has_more") or not results.get("next_cursor"):
+                break
+            data["start_cursor"] = results["next_cursor"]
+
+    def get_property_ids(self, names: List[str]) -> List[str]:
+        properties = self.get_database_schema().get("properties", {})
+        return [properties[name]["id"] for name in names if name in properties]
+
+    def fetch_existing_assignments(
+        self, property_names: List[str] = IDENTITY_PROPERTIES
+    ) -> List[Dict[str, Any]]:
+        """
+        Fetch every page in the database with only the properties that identify
+        an assignment, for rebuilding the local cache.
+        """
+        property_ids = self.get_property_ids(property_names)
+        return list(self.iter_database_pages(filter_properties=property_ids))
+
+    def post_data(self, data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Create pages concurrently while staying under Notion's rate limit.
+
+        :return: One response per item, in the same order as data
+        """
+        if not data:
+            return []
+        workers = min(self.max_concurrency, len(data))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(propagate_context(self.create_page), data))
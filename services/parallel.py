@@ -0,0 +1,58 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from services.utils import env_number
+
+# Below this many items the pool's startup and pickling cost outweighs the gain
+DEFAULT_THRESHOLD = 500
+# Items per task, large enough to amortize pickling each chunk to a worker
+DEFAULT_CHUNK_SIZE = 100
+
+
+def _mp_context():
+    """
+    Workers must not be forked: in the server the pool is created from a worker
+    thread while other threads hold the SQLite, requests and credential locks,
+    and a forked child would inherit them locked.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+
+def parallel_enabled():
+    return os.getenv("PARALLEL_PARSE", "false").lower() in ("1", "true", "yes")
+
+
+def map_chunks(func, items, workers=None, chunk_size=None, threshold=None, serial=None):
+    """
+    Apply func, which maps a list to a list, to items.
+
+    When PARALLEL_PARSE is enabled and there are at least `threshold` items, the
+    list is split into chunks that run on a ProcessPoolExecutor. The results are
+    concatenated in input order, so the output is the same as func(items).
+    func must be a module-level function so it can be pickled.
+
+    Workers start with forkserver (or spawn), which re-imports the entry-point
+    script as __mp_main__, so every script that can reach this must keep its
+    startup code under an `if __name__ == "__main__":` guard.
+
+    :param workers: Worker processes (PARSE_WORKERS, defaults to the CPU count)
+    :param chunk_size: Items per task (PARSE_CHUNK_SIZE)
+    :param threshold: Minimum number of items before a pool is used (PARALLEL_PARSE_THRESHOLD)
+    :param serial: Callable used instead of func when no pool is used
+    """
+    workers = workers or env_number("PARSE_WORKERS", os.cpu_count() or 1)
+    chunk_size = max(1, chunk_size or env_number("PARSE_CHUNK_SIZE", DEFAULT_CHUNK_SIZE))
+    threshold = threshold or env_number("PARALLEL_PARSE_THRESHOLD", DEFAULT_THRESHOLD)
+
+    if not parallel_enabled() or workers <= 1 or len(items) < threshold:
+        return (serial or func)(items)
+
+    chunks = [items[i : i + chunk_size] for i in range(0, len(items), chunk_size)]
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(chunks)), mp_context=_mp_context()
+    ) as executor:
+        # executor.map yields results in submission order
+        return [result for chunk in executor.map(func, chunks) for result in chunk]
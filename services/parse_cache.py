@@ -0,0 +1,108 @@
+import copy
+import logging
+import os
+from datetime import datetime
+
+from services.assignment_parser import PARSER_VERSION
+from services.email_extractor import EXTRACTOR_VERSION
+from services.metrics import count_cache
+
+
+def cache_version():
+    """Changes whenever the extractor or the parser output changes."""
+    return f"{EXTRACTOR_VERSION}.{PARSER_VERSION}"
+
+
+def refresh_page(page):
+    """
+    Copy a cached Notion page, updating the fields that depend on the run
+    rather than on the message: the parent database and "Last edited".
+    """
+    page = copy.deepcopy(page)
+    page["parent"] = {"database_id": os.environ.get("NOTION_DATABASE_ID")}
+    page["properties"]["Last edited"] = {
+        "date": {"start": datetime.now().isoformat(), "end": None}
+    }
+    return page
+
+
+class ParseCache:
+    """
+    Remembers the extracted fields and Notion page built for each message.
+
+    A Gmail message never changes, so its results are keyed by message ID and
+    reused on later runs; only new messages go through extraction and parsing.
+    Entries written by another extractor/parser version are ignored and dropped
+    on the next save. Messages without an assignment are cached too, so they
+    are not extracted again either.
+    """
+
+    def __init__(self, store, name="parse_cache"):
+        self.store = store
+        self.name = name
+        self.version = cache_version()
+        self.entries = {}
+        self.pending = []
+        self.hits = 0
+        self.misses = 0
+
+        records = store.load(name)
+        for record in records:
+            if isinstance(record, dict) and record.get("version") == self.version:
+                self.entries[record["id"]] = record
+        # Stale entries are removed by rewriting the snapshot instead of appending
+        self.needs_rewrite = len(self.entries) != len(records)
+
+    def process(self, messages, extract, parse):
+        """
+        Extract and parse messages, running extract/parse only for new ones.
+
+        :param messages: Filtered messages
+        :param extract: Maps messages to extracted dicts carrying "message_id"
+        :param parse: Maps extracted dicts to Notion pages, one per dict
+        :return: An (extracted_data, pages) tuple, in message order
+        """
+        new_messages = [msg for msg in messages if msg["id"] not in self.entries]
+        self.hits += len(messages) - len(new_messages)
+        self.misses += len(new_messages)
+        count_cache("parse", hits=len(messages) - len(new_messages), misses=len(new_messages))
+        logging.info(
+            f"Parse cache: {len(messages) - len(new_messages)} hits, {len(new_messages)} new messages"
+        )
+
+        if new_messages:
+            extracted = extract(new_messages)
+            pages = parse(extracted) if extracted else []
+            results = {
+                fields["message_id"]: (fields, page)
+                for fields, page in zip(extracted, pages)
+            }
+            for msg in new_messages:
+                fields, page = results.get(msg["id"], (None, None))
+                entry = {
+                    "id": msg["id"],
+                    "version": self.version,
+                    "extracted": fields,
+                    "page": page,
+                }
+                self.entries[msg["id"]] = entry
+                self.pending.append(entry)
+            self.save()
+
+        extracted_data = []
+        pages = []
+        for msg in messages:
+            entry = self.entries[msg["id"]]
+            if entry["extracted"] is None:
+                continue
+            extracted_data.append(entry["extracted"])
+            pages.append(refresh_page(entry["page"]))
+        return extracted_data, pages
+
+    def save(self):
+        if self.needs_rewrite:
+            self.store.save(self.name, list(self.entries.values()))
+            self.needs_rewrite = False
+        elif self.pending:
+            self.store.append(self.name, self.pending)
+        self.pending = []
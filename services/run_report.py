@@ -0,0 +1,190 @@
+import contextvars
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from services.utils import env_number, utc_now
+
+# Spans kept per report; later ones are only counted
+MAX_SPANS = 1000
+DEFAULT_HISTORY_SIZE = 50
+
+_current_report: contextvars.ContextVar = contextvars.ContextVar("run_report", default=None)
+
+
+def _spans_enabled():
+    return os.getenv("RUN_REPORT_SPANS", "false").lower() in ("1", "true", "yes")
+
+
+class RunReport:
+    """
+    Structured record of one sync: counts per stage, time per stage, what
+    happened to every assignment, errors and (optionally) spans around the
+    external API calls.
+
+    While activate() is in effect the pipeline reports into it through the
+    module-level helpers below, which do nothing when no report is active.
+    """
+
+    def __init__(self, trigger: Optional[str] = None, after_date: Optional[str] = None):
+        self.run_id = uuid.uuid4().hex
+        self.trigger = trigger
+        self.after_date = after_date
+        self.started_at = utc_now()
+        self.finished_at: Optional[str] = None
+        self.started = time.perf_counter()
+        self.duration_seconds: Optional[float] = None
+        self.status = "running"
+        self.message: Optional[str] = None
+        self.counts: Dict[str, int] = {}
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.items: List[Dict[str, Any]] = []
+        self.errors: List[Dict[str, Any]] = []
+        self.spans: List[Dict[str, Any]] = []
+        self.spans_dropped = 0
+        self.record_spans = _spans_enabled()
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def activate(self):
+        token = _current_report.set(self)
+        try:
+            yield self
+        finally:
+            _current_report.reset(token)
+
+    def count(self, name: str, value: int = 1):
+        with self.lock:
+            self.counts[name] = self.counts.get(name, 0) + value
+
+    def stage(self, stage: str, seconds: float):
+        with self.lock:
+            totals = self.stages.setdefault(stage, {"seconds": 0.0, "calls": 0})
+            totals["seconds"] = round(totals["seconds"] + seconds, 4)
+            totals["calls"] += 1
+
+    def item(self, **fields: Any):
+        with self.lock:
+            self.items.append(fields)
+
+    def error(self, message: str, stage: Optional[str] = None, **fields: Any):
+        with self.lock:
+            self.errors.append({"stage": stage, "message": message, "at": utc_now(), **fields})
+
+    def span(self, name: str, start: float, duration: float, attributes: Dict[str, Any], error: Optional[str]):
+        if not self.record_spans:
+            return
+        with self.lock:
+            if len(self.spans) >= MAX_SPANS:
+                self.spans_dropped += 1
+                return
+            self.spans.append(
+                {
+                    "name": name,
+                    "start_offset_seconds": round(start - self.started, 4),
+                    "duration_seconds": round(duration, 4),
+                    "attributes": attributes,
+                    "error": error,
+                }
+            )
+
+    def finish(self, result: Optional[Dict[str, Any]]):
+        self.finished_at = utc_now()
+        self.duration_seconds = round(time.perf_counter() - self.started, 3)
+        if isinstance(result, dict):
+            self.message = result.get("message")
+            if result.get("error"):
+                self.status = "error"
+                if not self.errors:
+                    self.error(str(result["error"]))
+            elif result.get("failed"):
+                self.status = "partial"
+            else:
+                self.status = "ok"
+        else:
+            self.status = "error"
+
+    def summary(self) -> Dict[str, Any]:
+        """The report without per-item outcomes and spans."""
+        with self.lock:
+            return {
+                "run_id": self.run_id,
+                "trigger": self.trigger,
+                "after_date": self.after_date,
+                "status": self.status,
+                "message": self.message,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "duration_seconds": self.duration_seconds,
+                "counts": dict(self.counts),
+                "stages": {stage: dict(totals) for stage, totals in self.stages.items()},
+                "errors": list(self.errors),
+            }
+
+    def to_dict(self) -> Dict[str, Any]:
+        report = self.summary()
+        with self.lock:
+            report["items"] = list(self.items)
+            if self.record_spans:
+                report["spans"] = list(self.spans)
+                report["spans_dropped"] = self.spans_dropped
+        return report
+
+
+def current_report() -> Optional[RunReport]:
+    return _current_report.get()
+
+
+def report_count(name: str, value: int = 1):
+    report = current_report()
+    if report is not None:
+        report.count(name, value)
+
+
+def report_stage(stage: str, seconds: float):
+    report = current_report()
+    if report is not None:
+        report.stage(stage, seconds)
+
+
+def report_item(**fields: Any):
+    report = current_report()
+    if report is not None:
+        report.item(**fields)
+
+
+def report_error(message: str, stage: Optional[str] = None, **fields: Any):
+    report = current_report()
+    if report is not None:
+        report.error(message, stage, **fields)
+
+
+class RunHistory:
+    """The most recent run reports, oldest dropped first (RUN_HISTORY_SIZE)."""
+
+    def __init__(self, size: Optional[int] = None):
+        if size is None:
+            size = env_number("RUN_HISTORY_SIZE", DEFAULT_HISTORY_SIZE)
+        self.reports: deque = deque(maxlen=max(1, size))
+        self.lock = threading.Lock()
+
+    def add(self, report: RunReport):
+        with self.lock:
+            self.reports.append(report)
+
+    def get(self, run_id: str) -> Optional[RunReport]:
+        with self.lock:
+            for report in self.reports:
+                if report.run_id == run_id:
+                    return report
+        return None
+
+    def recent(self, limit: Optional[int] = None) -> List[RunReport]:
+        """Newest first."""
+        with self.lock:
+            reports = list(reversed(self.reports))
+        return reports[:limit] if limit else reports
@@ -0,0 +1,195 @@
+import gzip
+import io
+import json
+import logging
+import os
+import tempfile
+import time
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # optional dependency, only needed for OUTPUT_COMPRESSION=zstd
+    zstandard = None
+
+EXTENSIONS = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+# What a truncated or otherwise damaged snapshot can raise while being read
+READ_ERRORS = (OSError, EOFError, ValueError, zlib.error) + (
+    (zstandard.ZstdError,) if zstandard is not None else ()
+)
+
+
+class SnapshotStore:
+    """
+    Reads and writes the outputs/ snapshot files.
+
+    Two formats are supported:
+
+    - "json": one JSON array per file, rewritten as a whole (the original layout)
+    - "jsonl": one record per line, so new records are appended instead of
+      re-serializing the full history
+
+    Either format can be gzip or zstd compressed. Full rewrites go to a temp file
+    that is renamed over the target, so readers never see a half-written file.
+    Debug dumps (filtered/extracted data, Notion responses) can be turned off.
+    """
+
+    def __init__(self, directory="outputs", format=None, compression=None, debug_dumps=None):
+        self.directory = directory
+        self.format = (format or os.getenv("OUTPUT_FORMAT", "json")).lower()
+        if self.format not in ("json", "jsonl"):
+            logging.warning(f"Unknown OUTPUT_FORMAT {self.format!r}, using json")
+            self.format = "json"
+        self.compression = (compression or os.getenv("OUTPUT_COMPRESSION", "none")).lower()
+        if self.compression not in EXTENSIONS:
+            logging.warning(f"Unknown OUTPUT_COMPRESSION {self.compression!r}, not compressing")
+            self.compression = "none"
+        if self.compression == "zstd" and zstandard is None:
+            logging.warning("zstandard is not installed, using gzip compression instead")
+            self.compression = "gzip"
+        if debug_dumps is None:
+            debug_dumps = os.getenv("OUTPUT_DEBUG_DUMPS", "true").lower() in ("1", "true", "yes")
+        self.debug_dumps = debug_dumps
+
+    def path(self, name, format=None, compression=None):
+        format = format or self.format
+        compression = compression or self.compression
+        return os.path.join(self.directory, f"{name}.{format}{EXTENSIONS[compression]}")
+
+    # File handles
+
+    def _open_read(self, path, compression):
+        if compression == "gzip":
+            return gzip.open(path, "rt", encoding="utf-8")
+        if compression == "zstd":
+            raw = open(path, "rb")
+            # Appends write one frame each, so read across frame boundaries
+            reader = zstandard.ZstdDecompressor().stream_reader(
+                raw, read_across_frames=True, closefd=True
+            )
+            return io.TextIOWrapper(reader, encoding="utf-8")
+        return open(path, "r", encoding="utf-8")
+
+    def _write_bytes(self, fh, data):
+        if self.compression == "gzip":
+            with gzip.GzipFile(fileobj=fh, mode="wb") as gz:
+                gz.write(data)
+        elif self.compression == "zstd":
+            fh.write(zstandard.ZstdCompressor().compress(data))
+        else:
+            fh.write(data)
+
+    # Serialization
+
+    def _serialize(self, records):
+        if self.format == "jsonl":
+            return "".join(json.dumps(record) + "\n" for record in records)
+        return json.dumps(records, indent=2)
+
+    def _parse(self, path, format, compression):
+        """
+        Read a snapshot file.
+
+        :return: A (records, damaged) tuple. When the file can't be read to the
+                 end, damaged is True and records holds what was read before
+                 the damaged part (nothing for the json format).
+        """
+        records = []
+        try:
+            with self._open_read(path, compression) as f:
+                if format == "json":
+                    content = f.read().strip()
+                    return (json.loads(content) if content else []), False
+                for line_number, line in enumerate(f, 1):
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        records.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        # A crash mid-append can leave a partial last line
+                        logging.warning(f"Skipping unreadable line {line_number} in {path}")
+        except READ_ERRORS as e:
+            # e.g. a compressed append cut short by a crash
+            logging.error(f"Error reading {path}: {e}")
+            return ([] if format == "json" else records), True
+        return records, False
+
+    def _recover(self, name, path, records):
+        """
+        Move a damaged snapshot aside and rewrite the records that could still
+        be read, so later appends don't land behind the damaged bytes.
+        """
+        damaged_path = f"{path}.damaged-{int(time.time())}"
+        os.replace(path, damaged_path)
+        logging.error(
+            f"Moved damaged snapshot {path} to {damaged_path}, kept {len(records)} records"
+        )
+        if records:
+            self.save(name, records)
+
+    # Public API
+
+    def load(self, name):
+        """
+        Load a snapshot, returning an empty list when there is none.
+
+        Falls back to a file in another format/compression (e.g. the original
+        outputs/<name>.json) so switching settings doesn't lose the history.
+        A damaged file is moved aside and replaced by the records read before
+        the damage.
+        """
+        candidates = [(self.format, self.compression)] + [
+            (format, compression)
+            for format in ("json", "jsonl")
+            for compression in EXTENSIONS
+            if (format, compression) != (self.format, self.compression)
+        ]
+        for format, compression in candidates:
+            path = self.path(name, format, compression)
+            if not os.path.exists(path):
+                continue
+            if compression == "zstd" and zstandard is None:
+                continue
+            records, damaged = self._parse(path, format, compression)
+            if damaged:
+                self._recover(name, path, records)
+            return records
+        logging.info(f"No snapshot for {name} found. Returning an empty list.")
+        return []
+
+    def save(self, name, records):
+        """Atomically replace a snapshot with records."""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(name)
+        print(f"Saving data to {path}...")
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=f".{name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                self._write_bytes(fh, self._serialize(records).encode("utf-8"))
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        print(f"Data saved to {path}")
+
+    def append(self, name, records):
+        """
+        Add records to a snapshot. In jsonl format only the new records are
+        written; in json format the file is rewritten with old + new records.
+        """
+        if not records:
+            return
+        if self.format != "jsonl" or not os.path.exists(self.path(name)):
+            self.save(name, self.load(name) + list(records))
+            return
+        path = self.path(name)
+        print(f"Appending {len(records)} records to {path}...")
+        with open(path, "ab") as fh:
+            self._write_bytes(fh, self._serialize(records).encode("utf-8"))
+
+    def save_debug(self, name, records):
+        """Write a debug dump unless OUTPUT_DEBUG_DUMPS is off."""
+        if self.debug_dumps:
+            self.save(name, records)
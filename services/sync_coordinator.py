@@ -0,0 +1,191 @@
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from services.utils import utc_now
+
+
+def broader_after_date(first: Optional[str], second: Optional[str]) -> Optional[str]:
+    """
+    Pick the after_date covering the larger window when coalescing two requests.
+
+    An explicit date wins over None (yesterday), and of two explicit dates the
+    earlier one wins. Unparseable dates fall back to the most recent request.
+    """
+    if first is None or second is None:
+        return first or second
+    try:
+        first_date = datetime.strptime(first, "%Y/%m/%d")
+        second_date = datetime.strptime(second, "%Y/%m/%d")
+    except ValueError:
+        return second
+    return first if first_date <= second_date else second
+
+
+class SyncCoordinator:
+    """
+    Single-flight guard around the sync pipeline.
+
+    At most one sync runs at a time. A trigger that arrives while a sync with the
+    same after_date is running attaches to it and receives its result. Any other
+    trigger (or one that asks for a follow-up) queues a single follow-up run that
+    starts when the current one finishes; further triggers attach to that
+    follow-up instead of queueing more runs.
+    """
+
+    def __init__(self, pipeline: Callable[[Optional[str]], Awaitable[Dict[str, Any]]]):
+        self.pipeline = pipeline
+        self.current: Optional[Dict[str, Any]] = None
+        self.pending: Optional[Dict[str, Any]] = None
+        self.last_run: Optional[Dict[str, Any]] = None
+        self.runs_started = 0
+        self.runs_coalesced = 0
+
+    @property
+    def running(self) -> bool:
+        return self.current is not None
+
+    async def run(
+        self, after_date: Optional[str] = None, trigger: str = "api", follow_up=False
+    ) -> Dict[str, Any]:
+        """
+        Run the pipeline, attaching to or queueing behind an in-flight sync.
+
+        :param trigger: Short label describing who asked for the sync
+        :param follow_up: Always queue a fresh run instead of attaching to the
+                          in-flight one (e.g. when new mail is known to have arrived)
+        """
+        if self.current is None:
+            return await asyncio.shield(self._start(after_date, trigger))
+
+        self.runs_coalesced += 1
+        if not follow_up and self.current["after_date"] == after_date:
+            self.current["attached"] += 1
+            return await asyncio.shield(self.current["task"])
+
+        if self.pending is None:
+            self.pending = {
+                "future": asyncio.get_running_loop().create_future(),
+                "after_date": after_date,
+                "trigger": trigger,
+                "requested_at": utc_now(),
+                "attached": 0,
+            }
+        else:
+            self.pending["after_date"] = broader_after_date(
+                self.pending["after_date"], after_date
+            )
+            self.pending["attached"] += 1
+        return await asyncio.shield(self.pending["future"])
+
+    def _start(self, after_date, trigger, attached=0) -> asyncio.Task:
+        task = asyncio.create_task(self._execute(after_date, trigger))
+        self.current = {
+            "task": task,
+            "after_date": after_date,
+            "trigger": trigger,
+            "started_at": utc_now(),
+            "started": time.monotonic(),
+            "attached": attached,
+        }
+        self.runs_started += 1
+        return task
+
+    async def _execute(self, after_date, trigger):
+        outcome = "error"
+        result = None
+        try:
+            result = await self.pipeline(after_date)
+            outcome = "ok"
+            return result
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        except Exception as e:
+            result = {"error": str(e)}
+            return result
+        finally:
+            current = self.current
+            self.last_run = {
+                "after_date": after_date,
+                "trigger": trigger,
+                "started_at": current["started_at"],
+                "finished_at": utc_now(),
+                "duration_seconds": round(time.monotonic() - current["started"], 3),
+                "attached": current["attached"],
+                "outcome": outcome,
+                "result": result,
+            }
+            self.current = None
+            if outcome == "cancelled":
+                self._cancel_pending()
+            else:
+                self._start_pending()
+
+    def _cancel_pending(self):
+        pending, self.pending = self.pending, None
+        if pending is not None and not pending["future"].done():
+            pending["future"].cancel()
+
+    def _start_pending(self):
+        pending, self.pending = self.pending, None
+        if pending is None:
+            return
+        task = self._start(pending["after_date"], pending["trigger"], pending["attached"])
+        future = pending["future"]
+
+        def resolve(finished: asyncio.Task):
+            if future.done():
+                return
+            if finished.cancelled():
+                future.cancel()
+            else:
+                future.set_result(finished.result())
+
+        task.add_done_callback(resolve)
+
+    async def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for the running sync and a queued follow-up to finish, e.g. on
+        shutdown. Runs still going after timeout seconds are cancelled.
+
+        :return: True if everything finished on its own
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.current is not None:
+            task = self.current["task"]
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            done, _ = await asyncio.wait({task}, timeout=remaining)
+            if not done:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                return False
+        return True
+
+    def status(self) -> Dict[str, Any]:
+        current = None
+        if self.current is not None:
+            current = {
+                "after_date": self.current["after_date"],
+                "trigger": self.current["trigger"],
+                "started_at": self.current["started_at"],
+                "running_seconds": round(
+                    time.monotonic() - self.current["started"], 3
+                ),
+                "attached": self.current["attached"],
+            }
+        pending = None
+        if self.pending is not None:
+            pending = {
+                key: self.pending[key]
+                for key in ("after_date", "trigger", "requested_at", "attached")
+            }
+        return {
+            "running": self.running,
+            "current": current,
+            "follow_up": pending,
+            "last_run": self.last_run,
+            "runs_started": self.runs_started,
+            "runs_coalesced": self.runs_coalesced,
+        }
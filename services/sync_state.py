@@ -0,0 +1,46 @@
+import json
+import os
+import logging
+
+
+class SyncState:
+    """Small persistent key/value store for sync bookkeeping (e.g. the last Gmail historyId)."""
+
+    def __init__(self, state_file="cache/gmail_state.json"):
+        self.state_file = state_file
+        self.state = self.load_state()
+
+    def load_state(self):
+        if os.path.exists(self.state_file):
+            try:
+                with open(self.state_file, "r") as f:
+                    content = f.read().strip()
+                    if content:
+                        return json.loads(content)
+                    return {}
+            except json.JSONDecodeError:
+                logging.error(
+                    f"Error decoding JSON from {self.state_file}. Starting with an empty sync state."
+                )
+                return {}
+        return {}
+
+    def save_state(self):
+        directory = os.path.dirname(self.state_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.state_file, "w") as f:
+            json.dump(self.state, f, indent=2)
+
+    def get(self, key, default=None):
+        return self.state.get(key, default)
+
+    def set(self, key, value):
+        if self.state.get(key) != value:
+            self.state[key] = value
+            self.save_state()
+
+    def clear(self, key):
+        if key in self.state:
+            del self.state[key]
+            self.save_state()
@@ -0,0 +1,73 @@
+import contextvars
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict
+
+from services.run_report import current_report
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:  # optional dependency, only needed for OTEL_TRACING=true
+    otel_trace = None
+
+_tracer = None
+
+
+def _otel_tracer():
+    global _tracer
+    if otel_trace is None:
+        return None
+    if os.getenv("OTEL_TRACING", "false").lower() not in ("1", "true", "yes"):
+        return None
+    if _tracer is None:
+        _tracer = otel_trace.get_tracer("classroom-to-notion")
+    return _tracer
+
+
+@contextmanager
+def _otel_span(name: str, attributes: Dict[str, Any]):
+    tracer = _otel_tracer()
+    if tracer is None:
+        yield
+        return
+    # Records exceptions and sets the span status itself
+    with tracer.start_as_current_span(name, attributes=attributes):
+        yield
+
+
+@contextmanager
+def span(name: str, **attributes: Any):
+    """
+    Trace an external call.
+
+    The span is added to the active run report when RUN_REPORT_SPANS is on,
+    and exported through OpenTelemetry when the opentelemetry package is
+    installed and OTEL_TRACING is on. Otherwise this only costs a timer.
+    """
+    start = time.perf_counter()
+    error = None
+    try:
+        with _otel_span(name, attributes):
+            yield
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        report = current_report()
+        if report is not None:
+            report.span(name, start, time.perf_counter() - start, attributes, error)
+
+
+def propagate_context(func: Callable) -> Callable:
+    """
+    Bind func to the calling thread's context, so work handed to a thread pool
+    or background thread still reports into the same run report and trace.
+    """
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        # Each call gets its own copy; one Context can't be entered by two threads
+        return context.copy().run(func, *args, **kwargs)
+
+    return run
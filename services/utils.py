@@ -0,0 +1,15 @@
+import os
+from datetime import datetime, timezone
+
+
+def env_number(name, default, cast=int):
+    """Read a numeric environment variable, using default when it is unset or invalid."""
+    try:
+        return cast(os.getenv(name, "") or default)
+    except ValueError:
+        return default
+
+
+def utc_now():
+    """The current UTC time as an ISO 8601 string."""
+    return datetime.now(timezone.utc).isoformat()